@@ -91,6 +91,14 @@ __api_notification_email__ = 'alerts' + __email_domain__
 __mail_server__ = '169.254.1.1'
 __from_address__ = 'apiserver'  + __email_domain__
 
+####################################################################################
+#
+# change this for the local cache of live device configuration (see '--cache-ttl')
+#
+####################################################################################
+
+__cache_dir__ = '../data/cache/'
+
 ####################################################################################
 
 import argparse
@@ -104,6 +112,9 @@ import ipaddress
 import time
 import re
 import smtplib
+import hashlib
+import heapq
+import xml.etree.ElementTree as ET
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -113,7 +124,7 @@ today = datetime.today()
 
 from collections import OrderedDict
 from collections import defaultdict
-from more_itertools import unique_everseen
+from concurrent.futures import ThreadPoolExecutor
 from pandevice.base import PanDevice
 from pandevice.device import Vsys
 from pandevice.device import SystemSettings
@@ -157,37 +168,221 @@ from pprint import pprint
 #
 ####################################################################################
 
-class Dip:
+class Record:
+    # base for the dbedit records below, fields are fixed by '__slots__' (no per-object __dict__) and read-only once set
+    # records compare and hash on their field values so they can be kept in sets
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for key, value in zip(self.__slots__, values):
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('{} is read-only'.format(type(self).__name__))
+
+    def __delattr__(self, key):
+        raise AttributeError('{} is read-only'.format(type(self).__name__))
+
+    def key(self):
+        # list values (e.g. Dip ip/tag, EditObject field values) are frozen to tuples so the record can be hashed
+        return Record.freeze(tuple(getattr(self, k) for k in self.__slots__))
+
+    @staticmethod
+    def freeze(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(Record.freeze(v) for v in value)
+        return value
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash((type(self), self.key()))
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join('{}={!r}'.format(k, getattr(self, k)) for k in self.__slots__))
+
+class Dip(Record):
+    # ip (list or str)
+    # tag (list or str)
+    __slots__ = ('ip', 'tag')
+
     def __init__(self, ip, tag):
-        # ip (list or str)
-        # tags (list or str)
-        self.ip = ip
-        self.tag = tag
-        self.name = '-'.join((str(ip), str(tag)))
+        Record.__init__(self, ip, tag)
+
+    @property
+    def name(self):
+        # only needed for logging and failures so built on demand rather than stored with every DIP
+        return '-'.join((str(self.ip), str(self.tag)))
+
+class DeleteObject(Record):
+    __slots__ = ('name', 'type')
 
-class DeleteObject:
     def __init__(self, name, type):
-        self.name = name
-        self.type = type
+        Record.__init__(self, name, type)
+
+class EditObject(Record):
+    # fields (tuple) (variable, value) pairs to set on the live object, kept apart from the 'name' and 'type' that locate it
+    __slots__ = ('name', 'type', 'fields')
 
-class EditObject:
-    def __init__(self, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+    def __init__(self, name, type, fields):
+        Record.__init__(self, name, type, tuple(fields.items()))
+
+class ModifyGroup(Record):
+    __slots__ = ('name', 'type', 'members', 'action', 'description')
 
-class ModifyGroup:
     def __init__(self, name, type, members, action, description):
-        self.name = name
-        self.type = type
-        self.action = action
-        self.members = members
-        self.description = description
+        Record.__init__(self, name, type, members, action, description)
+
+class RenameObject(Record):
+    __slots__ = ('name', 'type', 'newname')
 
-class RenameObject:
     def __init__(self, name, type, newname):
-        self.name = name
-        self.type = type
-        self.newname = newname
+        Record.__init__(self, name, type, newname)
+
+class CreateBatch:
+    def __init__(self, size, dip_size=0):
+        # size (int) objects per API call, 0 disables batching
+        # pending (dict) xpath -> list of queued objects, kept in CSV order
+        # dip_size (int) registered-ip updates per User-ID message, 0 disables batching
+        # dips (list) queued ('register' or 'unregister', Dip) pairs, kept in CSV order
+        self.size = size
+        self.pending = OrderedDict()
+        self.dip_size = dip_size
+        self.dips = list()
+        # groups (dict) (group class, name) -> [tree, available member names, list of queued ModifyGroup], kept in CSV order
+        self.groups = OrderedDict()
+        # patches (dict) xpath -> list of queued (object, '<entry>' holding only the edited leaves, variable names) edits, kept in CSV order
+        self.patches = OrderedDict()
+
+    def add(self, object):
+        self.pending.setdefault(object.xpath_short(), list()).append(object)
+
+    def add_dip(self, action, dip):
+        self.dips.append((action, dip))
+
+    def add_patch(self, object, entry, variables):
+        self.patches.setdefault(object.xpath_short(), list()).append((object, entry, variables))
+
+    def add_modification(self, subclass, tree, available_members, modification):
+        self.groups.setdefault((subclass, modification.name), [tree, available_members, list()])[2].append(modification)
+
+class ConfigSnapshot:
+    def __init__(self, xpath, root, read_at=None):
+        # xpath (str) location the snapshot was read from
+        # root (Element) config found at that xpath, None if nothing was configured there
+        # read_at (float) time the snapshot was read from the live device, None if it came from the local cache
+        self.xpath = xpath
+        self.root = root
+        self.read_at = read_at
+
+    def covers(self, xpath):
+        return xpath.startswith(self.xpath + '/')
+
+    def find(self, xpath):
+        # returns the element at an xpath below the snapshot xpath, or None if it is not configured
+        if self.root is None:
+            return None
+        return self.root.find(xpath[len(self.xpath) + 1:])
+
+class DbeditIndex:
+    def __init__(self):
+        # objects (dict) (vendor, location, op_action, class) -> list of parsed dbedit objects, kept in CSV order
+        # seen (set) ids of objects already stored, an object is only kept once however often it is added
+        self.objects = dict()
+        self.seen = set()
+
+    def add(self, vendor, location, op_action, object):
+        if id(object) in self.seen:
+            return
+        self.seen.add(id(object))
+        # file under every class the object is an instance of so lookups by base class are a single dict access
+        for cls in type(object).__mro__:
+            self.objects.setdefault((vendor, location, op_action, cls), list()).append(object)
+
+    def get(self, vendor, location, op_action, cls):
+        return list(self.objects.get((vendor, location, op_action, cls), list()))
+
+class ObjectCache:
+    def __init__(self, max_age):
+        # max_age (int) seconds an object collected from the live device is written without refreshing it first, 0 always refreshes
+        # objects (dict) id(object) -> (object, time it was read from the live device)
+        self.max_age = max_age
+        self.objects = dict()
+
+    def add(self, objects, read_at):
+        # read_at None means the objects were not read from the live device (e.g. the local cache) so they are never trusted
+        if read_at is None or not self.max_age:
+            return
+        for object in objects:
+            self.objects[id(object)] = (object, read_at)
+
+    def discard(self, object):
+        self.objects.pop(id(object), None)
+
+    def fresh(self, object):
+        entry = self.objects.get(id(object))
+        return entry is not None and entry[0] is object and time.time() - entry[1] <= self.max_age
+
+class NameScope:
+    __slots__ = ('layers',)
+
+    def __init__(self, *layers):
+        # layers (label, names) pairs from the most general to the most specific, e.g. predefined, shared, device group, dbedit
+        # names is a set (referenced, never copied, so names added to it later are found too) or another NameScope whose own layers are taken over as they are
+        flat = list()
+        for label, names in layers:
+            if isinstance(names, NameScope):
+                flat.extend(names.layers)
+            elif names is not None:
+                flat.append((label, names))
+        object.__setattr__(self, 'layers', tuple(flat))
+
+    def __setattr__(self, key, value):
+        raise AttributeError('{} is read-only'.format(type(self).__name__))
+
+    def __delattr__(self, key):
+        raise AttributeError('{} is read-only'.format(type(self).__name__))
+
+    def extend(self, label, names):
+        # returns a new scope with names searched before the existing layers, this scope is left as it is
+        return NameScope(('', self), (label, names))
+
+    def resolve(self, name):
+        # returns the label of the most specific layer holding name, None if no layer does
+        for label, names in reversed(self.layers):
+            if name in names:
+                return label
+        return None
+
+    def __contains__(self, name):
+        return any(name in names for label, names in self.layers)
+
+    def __bool__(self):
+        return any(names for label, names in self.layers)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join('{}={}'.format(label, len(names)) for label, names in self.layers))
+
+class ConfigCache:
+    def __init__(self, directory, device, version, ttl, refresh):
+        # directory (str) where the entries are kept
+        # device (str) hostname the cached config was read from
+        # version (str) config or content version of the device, entries from other versions are never used
+        # ttl (int) minutes an entry stays valid, None if entries never expire
+        # refresh (bool) ignore existing entries and read the live device again
+        self.directory = directory
+        self.device = device
+        self.version = version
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def prefix(self):
+        return self.directory + re.sub(r'[^\w.-]', '_', self.device) + '_'
+
+    def filename(self, key):
+        # keys are xpaths so hash them into something filename safe
+        return self.prefix() + re.sub(r'[^\w.-]', '_', self.version) + '_' + hashlib.sha1(key.encode('utf-8')).hexdigest() + '.xml'
 
 ####################################################################################
 #
@@ -195,7 +390,7 @@ class RenameObject:
 #
 ####################################################################################
 
-def update_objects(objects, tree, devtype, devname, action, args, logger, filename, failures, available_tag_names, available_address_names, available_address_group_names, available_service_names, available_service_group_names, available_application_names, available_application_group_names, existing_rule_names, existing_zone_names, existing_nat_names, existing_interface_names, existing_route_names, existing_dip_names):
+def update_objects(objects, tree, devtype, devname, action, args, logger, filename, failures, available_tag_names, available_address_names, available_address_group_names, available_service_names, available_service_group_names, available_application_names, available_application_group_names, existing_rule_names, existing_zone_names, existing_nat_names, existing_interface_names, existing_route_names, existing_dip_names, live_objects=None):
 
     if objects:
 
@@ -204,214 +399,350 @@ def update_objects(objects, tree, devtype, devname, action, args, logger, filena
 
         null_set = set()
 
+        # queue creates so they can be pushed in bulk (see '--batch-size')
+        batch = CreateBatch(args.batch_size, args.dip_batch_size)
+
+        if any(issubclass(type(o), DeleteObject) for o in objects):
+            # look up the groups holding an object instead of checking every group on the device
+            member_index = get_palo_member_index(tree)
+
+        if action == 'sync':
+            # the objects are the desired registered-ips, only the difference with the live ones is sent
+            sync_palo_dips(args, logger, objects, existing_dip_names, devtype, tree, filename, failures, batch)
+            objects = list()
+
+        if action == 'create':
+            # create anything another object in this list refers to first, e.g. a new group nested in another new group
+            objects = order_palo_objects(objects, args, logger)
+            # new groups are added once their create is accepted, so a group whose checks or create failed is never taken as a member
+            staged_address_group_names = set()
+            staged_service_group_names = set()
+            staged_application_group_names = set()
+            # names a new group member may refer to, built once here rather than per group (the staged sets are referenced, not copied)
+            address_member_names = NameScope(('live', available_address_names), ('staged', staged_address_group_names))
+            service_member_names = NameScope(('live', available_service_names), ('live', available_service_group_names), ('staged', staged_service_group_names))
+            application_member_names = NameScope(('live', available_application_names), ('live', available_application_group_names), ('staged', staged_application_group_names))
+            if args.verbose == 3:
+                # where each name the new objects refer to was found (see NameScope)
+                reference_names = NameScope(('live', available_tag_names), ('live', address_member_names), ('live', available_address_group_names), ('live', service_member_names), ('live', application_member_names), ('live', existing_zone_names), ('live', existing_interface_names), ('fixed', {'any', 'application-default'}))
+            if args.reconcile:
+                # names each changed variable of an existing object may refer to, the same ones the create functions check (see 'reconcile_palo_object')
+                zone_names = NameScope(('live', existing_zone_names), ('fixed', {'any'}))
+                rule_address_names = NameScope(('live', address_member_names), ('live', available_address_group_names), ('fixed', {'any'}))
+                rule_service_names = NameScope(('live', service_member_names), ('fixed', {'any', 'application-default'}))
+                reconcile_names = {AddressGroup: {'tag': available_tag_names, 'static_value': NameScope(('live', address_member_names), ('live', available_address_group_names))},
+                                   AddressObject: {'tag': available_tag_names},
+                                   ServiceGroup: {'tag': available_tag_names, 'value': service_member_names},
+                                   ServiceObject: {'tag': available_tag_names},
+                                   ApplicationGroup: {'value': application_member_names},
+                                   SecurityRule: {'fromzone': zone_names, 'tozone': zone_names, 'source': rule_address_names, 'destination': rule_address_names, 'application': NameScope(('live', application_member_names), ('fixed', {'any'})), 'service': rule_service_names, 'tag': available_tag_names},
+                                   NatRule: {'fromzone': zone_names, 'tozone': zone_names, 'source': rule_address_names, 'service': NameScope(('live', service_member_names), ('fixed', {'any'})), 'to_interface': NameScope(('live', existing_interface_names), ('fixed', {'any'})), 'tag': available_tag_names}}
+
         for o in objects:
             if issubclass(type(o), RenameObject):
                 if o.type == 'address':
-                    rename_palo_object(args, logger, o, available_address_names, devtype, AddressObject, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_address_names, devtype, AddressObject, tree, filename, failures, live_objects)
                 elif o.type == 'address-group':
-                    rename_palo_object(args, logger, o, available_address_group_names, devtype, AddressGroup, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_address_group_names, devtype, AddressGroup, tree, filename, failures, live_objects)
                 elif o.type == 'service':
-                    rename_palo_object(args, logger, o, available_service_names, devtype, ServiceObject, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_service_names, devtype, ServiceObject, tree, filename, failures, live_objects)
                 elif o.type == 'service-group':
-                    rename_palo_object(args, logger, o, available_service_group_names, devtype, ServiceGroup, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_service_group_names, devtype, ServiceGroup, tree, filename, failures, live_objects)
                 elif o.type == 'tag':
-                    rename_palo_object(args, logger, o, available_tag_names, devtype, Tag, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_tag_names, devtype, Tag, tree, filename, failures, live_objects)
                 elif o.type == 'application':
-                    rename_palo_object(args, logger, o, available_application_names, devtype, ApplicationObject, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_application_names, devtype, ApplicationObject, tree, filename, failures, live_objects)
                 elif o.type == 'application-group':
-                    rename_palo_object(args, logger, o, available_application_group_names, devtype, ApplicationGroup, tree, filename, failures)
+                    rename_palo_object(args, logger, o, available_application_group_names, devtype, ApplicationGroup, tree, filename, failures, live_objects)
                 elif o.type == 'application-filter':
-                    rename_palo_object(args, logger, o, null_set, devtype, ApplicationFilter, tree, filename, failures)
+                    rename_palo_object(args, logger, o, null_set, devtype, ApplicationFilter, tree, filename, failures, live_objects)
                 elif o.type == 'security-rule':
-                    rename_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, tree, filename, failures)
+                    rename_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, get_palo_rulebase(tree), filename, failures, live_objects)
                 elif o.type == 'nat-rule':
-                    rename_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, tree, filename, failures)
+                    rename_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, get_palo_rulebase(tree), filename, failures, live_objects)
                 elif o.type == 'pre-security-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PreRulebase):
-                            rename_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures)
+                            rename_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'pre-nat-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PreRulebase):
-                            rename_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures)
+                            rename_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'post-security-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PostRulebase):
-                            rename_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures)
+                            rename_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'post-nat-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PostRulebase):
-                            rename_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures)
+                            rename_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures, live_objects)
                 else:
                     logger.warning('update_objects - RenameObject - Unsupported type \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.type, o.name))
             elif issubclass(type(o), DeleteObject):
                 if o.type == 'address':
-                    # remove from all AddressGroup first!
-                    for group in available_address_group_names:
+                    # remove from every AddressGroup holding it first!
+                    for group in sorted(member_index[AddressGroup][o.name]):
                         p = ModifyGroup(name=group, type='address-group', members=[o.name], action=None, description=None)
                         remove_from_palo_group(args, logger, p, available_address_group_names, available_address_names, devtype, AddressGroup, tree, filename, failures)
-                    delete_palo_object(args, logger, o, available_address_names, devtype, AddressObject, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_address_names, devtype, AddressObject, tree, filename, failures, live_objects)
                 elif o.type == 'address-group':
-                    delete_palo_object(args, logger, o, available_address_group_names, devtype, AddressGroup, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_address_group_names, devtype, AddressGroup, tree, filename, failures, live_objects)
                 elif o.type == 'service':
-                    # remove from all ServiceGroup first!
-                    for group in available_service_group_names:
+                    # remove from every ServiceGroup holding it first!
+                    for group in sorted(member_index[ServiceGroup][o.name]):
                         p = ModifyGroup(name=group, type='service-group', members=[o.name], action=None, description=None)
                         remove_from_palo_group(args, logger, p, available_service_group_names, available_service_names, devtype, ServiceGroup, tree, filename, failures)
-                    delete_palo_object(args, logger, o, available_service_names, devtype, ServiceObject, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_service_names, devtype, ServiceObject, tree, filename, failures, live_objects)
                 elif o.type == 'service-group':
-                    delete_palo_object(args, logger, o, available_service_group_names, devtype, ServiceGroup, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_service_group_names, devtype, ServiceGroup, tree, filename, failures, live_objects)
                 elif o.type == 'tag':
-                    delete_palo_object(args, logger, o, available_tag_names, devtype, Tag, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_tag_names, devtype, Tag, tree, filename, failures, live_objects)
                 elif o.type == 'application':
-                    # remove from all ApplicationGroup first!
-                    for group in available_application_group_names:
+                    # remove from every ApplicationGroup holding it first!
+                    for group in sorted(member_index[ApplicationGroup][o.name]):
                         p = ModifyGroup(name=group, type='application-group', members=[o.name], action=None, description=None)
                         remove_from_palo_group(args, logger, p, available_application_group_names, available_application_names, devtype, ApplicationGroup, tree, filename, failures)
-                    delete_palo_object(args, logger, o, available_application_names, devtype, ApplicationObject, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_application_names, devtype, ApplicationObject, tree, filename, failures, live_objects)
                 elif o.type == 'application-group':
-                    delete_palo_object(args, logger, o, available_application_group_names, devtype, ApplicationGroup, tree, filename, failures)
+                    delete_palo_object(args, logger, o, available_application_group_names, devtype, ApplicationGroup, tree, filename, failures, live_objects)
                 elif o.type == 'application-filter':
-                    delete_palo_object(args, logger, o, null_set, devtype, ApplicationFilter, tree, filename, failures)
+                    delete_palo_object(args, logger, o, null_set, devtype, ApplicationFilter, tree, filename, failures, live_objects)
                 elif o.type == 'security-rule':
-                    delete_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, tree, filename, failures)
+                    delete_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, get_palo_rulebase(tree), filename, failures, live_objects)
                 elif o.type == 'nat-rule':
-                    delete_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, tree, filename, failures)
+                    delete_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, get_palo_rulebase(tree), filename, failures, live_objects)
                 elif o.type == 'pre-security-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PreRulebase):
-                            delete_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures)
+                            delete_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'pre-nat-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PreRulebase):
-                            delete_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures)
+                            delete_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'post-security-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PostRulebase):
-                            delete_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures)
+                            delete_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'post-nat-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PostRulebase):
-                            delete_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures)
+                            delete_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures, live_objects)
                 elif o.type == 'route':
-                    delete_palo_object(args, logger, o, null_set, devtype, StaticRoute, tree, filename, failures)
+                    delete_palo_object(args, logger, o, null_set, devtype, StaticRoute, tree, filename, failures, live_objects)
                 else:
                     logger.warning('update_objects - DeleteObject - Unsupported type \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.type, o.name))
             elif issubclass(type(o), EditObject):
                 if o.type == 'address':
-                    edit_palo_object(args, logger, o, available_address_names, devtype, AddressObject, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_address_names, devtype, AddressObject, tree, filename, failures, live_objects, batch)
                 elif o.type == 'address-group':
-                    edit_palo_object(args, logger, o, available_address_group_names, devtype, AddressGroup, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_address_group_names, devtype, AddressGroup, tree, filename, failures, live_objects, batch)
                 elif o.type == 'service':
-                    edit_palo_object(args, logger, o, available_service_names, devtype, ServiceObject, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_service_names, devtype, ServiceObject, tree, filename, failures, live_objects, batch)
                 elif o.type == 'service-group':
-                    edit_palo_object(args, logger, o, available_service_group_names, devtype, ServiceGroup, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_service_group_names, devtype, ServiceGroup, tree, filename, failures, live_objects, batch)
                 elif o.type == 'tag':
-                    edit_palo_object(args, logger, o, available_tag_names, devtype, Tag, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_tag_names, devtype, Tag, tree, filename, failures, live_objects, batch)
                 elif o.type == 'application':
-                    edit_palo_object(args, logger, o, available_application_names, devtype, ApplicationObject, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_application_names, devtype, ApplicationObject, tree, filename, failures, live_objects, batch)
                 elif o.type == 'application-group':
-                    edit_palo_object(args, logger, o, available_application_group_names, devtype, ApplicationGroup, tree, filename, failures)
+                    edit_palo_object(args, logger, o, available_application_group_names, devtype, ApplicationGroup, tree, filename, failures, live_objects, batch)
                 elif o.type == 'application-filter':
-                    edit_palo_object(args, logger, o, null_set, devtype, ApplicationFilter, tree, filename, failures)
+                    edit_palo_object(args, logger, o, null_set, devtype, ApplicationFilter, tree, filename, failures, live_objects, batch)
                 elif o.type == 'security-rule':
-                    edit_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, tree, filename, failures)
+                    edit_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, get_palo_rulebase(tree), filename, failures, live_objects, batch)
                 elif o.type == 'nat-rule':
-                    edit_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, tree, filename, failures)
+                    edit_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, get_palo_rulebase(tree), filename, failures, live_objects, batch)
                 elif o.type == 'pre-security-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PreRulebase):
-                            edit_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures)
+                            edit_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures, live_objects, batch)
                 elif o.type == 'pre-nat-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PreRulebase):
-                            edit_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures)
+                            edit_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures, live_objects, batch)
                 elif o.type == 'post-security-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PostRulebase):
-                            edit_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures)
+                            edit_palo_object(args, logger, o, existing_rule_names, devtype, SecurityRule, grandchild, filename, failures, live_objects, batch)
                 elif o.type == 'post-nat-rule':
                     for grandchild in tree.children:
                         if issubclass(type(grandchild), PostRulebase):
-                            edit_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures)
+                            edit_palo_object(args, logger, o, existing_nat_names, devtype, NatRule, grandchild, filename, failures, live_objects, batch)
                 elif o.type == 'route':
-                    edit_palo_object(args, logger, o, null_set, devtype, StaticRoute, tree, filename, failures)
+                    edit_palo_object(args, logger, o, null_set, devtype, StaticRoute, tree, filename, failures, live_objects, batch)
                 else:
                     logger.warning('update_objects - EditObject - Unsupported type \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.type, o.name))
             elif issubclass(type(o), ModifyGroup):
                 if o.type == 'address-group':
                     if o.action == 'addtogroup':
-                        add_to_palo_group(args, logger, o, available_address_group_names, available_address_names, devtype, AddressGroup, tree, filename, failures)
+                        add_to_palo_group(args, logger, o, available_address_group_names, available_address_names, devtype, AddressGroup, tree, filename, failures, batch, live_objects)
                     elif o.action == 'removefromgroup':
-                        remove_from_palo_group(args, logger, o, available_address_group_names, available_address_names, devtype, AddressGroup, tree, filename, failures)
+                        remove_from_palo_group(args, logger, o, available_address_group_names, available_address_names, devtype, AddressGroup, tree, filename, failures, batch, live_objects)
                     else:
                         logger.warning('update_objects - ModifyGroup - Unsupported action \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.action, o.name))
                 elif o.type == 'service-group':
                     if o.action == 'addtogroup':
-                        add_to_palo_group(args, logger, o, available_service_group_names, available_service_names, devtype, ServiceGroup, tree, filename, failures)
+                        add_to_palo_group(args, logger, o, available_service_group_names, available_service_names, devtype, ServiceGroup, tree, filename, failures, batch, live_objects)
                     elif o.action == 'removefromgroup':
-                        remove_from_palo_group(args, logger, o, available_service_group_names, available_service_names, devtype, ServiceGroup, tree, filename, failures)
+                        remove_from_palo_group(args, logger, o, available_service_group_names, available_service_names, devtype, ServiceGroup, tree, filename, failures, batch, live_objects)
                     else:
                         logger.warning('update_objects - ModifyGroup - Unsupported action \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.action, o.name))
                 elif o.type == 'application-group':
                     if o.action == 'addtogroup':
-                        add_to_palo_group(args, logger, o, available_application_group_names, available_application_names, devtype, ApplicationGroup, tree, filename, failures)
+                        add_to_palo_group(args, logger, o, available_application_group_names, available_application_names, devtype, ApplicationGroup, tree, filename, failures, batch, live_objects)
                     elif o.action == 'removefromgroup':
-                        remove_from_palo_group(args, logger, o, available_application_group_names, available_application_names, devtype, ApplicationGroup, tree, filename, failures)
+                        remove_from_palo_group(args, logger, o, available_application_group_names, available_application_names, devtype, ApplicationGroup, tree, filename, failures, batch, live_objects)
                     else:
                         logger.warning('update_objects - ModifyGroup - Unsupported action \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.action, o.name))
                 else:
                     logger.warning('update_objects - ModifyGroup - Unsupported type \'{}\' for \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(o.type, o.name))
             else:
+                if action == 'create' and args.reconcile and not issubclass(type(o), Dip):
+                    # existing objects are compared with the live object instead (see '--reconcile')
+                    if reconcile_palo_object(args, logger, o, devtype, tree, filename, failures, reconcile_names.get(type(o))):
+                        continue
                 if action == 'create':
+                    if args.verbose == 3:
+                        log_palo_references(args, logger, o, reference_names, devtype, devname)
                     if issubclass(type(o), AddressGroup):
-                        create_palo_address_group(args, logger, o, available_address_group_names, available_tag_names, available_address_names, devtype, tree, filename, failures)
+                        if create_palo_address_group(args, logger, o, available_address_group_names, available_tag_names, address_member_names, devtype, tree, filename, failures, batch):
+                            staged_address_group_names.add(o.name)
                     elif issubclass(type(o), AddressObject):
-                        create_palo_address(args, logger, o, available_address_names, available_tag_names, devtype, tree, filename, failures)
+                        create_palo_address(args, logger, o, available_address_names, available_tag_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), ApplicationFilter):
                         logger.warning('Yet to support creation of ApplicationFilter objects')
                     elif issubclass(type(o), ApplicationGroup):
-                        create_palo_application_group(args, logger, o, available_application_group_names, available_application_names, devtype, tree, filename, failures)
+                        if create_palo_application_group(args, logger, o, available_application_group_names, application_member_names, devtype, tree, filename, failures, batch):
+                            staged_application_group_names.add(o.name)
                     elif issubclass(type(o), ApplicationObject):
-                        create_palo_application(args, logger, o, available_application_names, devtype, tree, filename, failures)
+                        create_palo_application(args, logger, o, available_application_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), ServiceGroup):
-                        create_palo_service_group(args, logger, o, available_service_group_names, available_tag_names, available_service_names, devtype, tree, filename, failures)
+                        if create_palo_service_group(args, logger, o, available_service_group_names, available_tag_names, service_member_names, devtype, tree, filename, failures, batch):
+                            staged_service_group_names.add(o.name)
                     elif issubclass(type(o), ServiceObject):
-                        create_palo_service(args, logger, o, available_service_names, available_tag_names, devtype, tree, filename, failures)
+                        create_palo_service(args, logger, o, available_service_names, available_tag_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), Tag):
-                        create_palo_tag(args, logger, o, available_tag_names, devtype, tree, filename, failures)
+                        create_palo_tag(args, logger, o, available_tag_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), Dip):
-                        create_palo_dip(args, logger, o, existing_dip_names, devtype, tree, filename, failures)
+                        create_palo_dip(args, logger, o, existing_dip_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), StaticRoute):
-                        create_palo_route(args, logger, o, existing_route_names, devtype, tree, filename, failures)
+                        create_palo_route(args, logger, o, existing_route_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), SecurityRule):
-                        create_palo_rule(args, logger, o, existing_rule_names, existing_zone_names, available_address_names, available_address_group_names, available_service_names, available_service_group_names, available_application_names, available_application_group_names, available_tag_names, devtype, tree, filename, failures)
+                        create_palo_rule(args, logger, o, existing_rule_names, existing_zone_names, available_address_names, available_address_group_names, available_service_names, available_service_group_names, available_application_names, available_application_group_names, available_tag_names, devtype, tree, filename, failures, batch)
                     elif issubclass(type(o), NatRule):
-                        create_palo_nat(args, logger, o, existing_nat_names, existing_zone_names, available_address_names, available_address_group_names, available_service_names, available_service_group_names, existing_interface_names, available_tag_names, devtype, tree, filename, failures)
+                        create_palo_nat(args, logger, o, existing_nat_names, existing_zone_names, available_address_names, available_address_group_names, available_service_names, available_service_group_names, existing_interface_names, available_tag_names, devtype, tree, filename, failures, batch)
                 elif action == 'delete':
                     if issubclass(type(o), Dip):
-                        delete_palo_dip(args, logger, o, existing_dip_names, devtype, tree, filename, failures)
+                        delete_palo_dip(args, logger, o, existing_dip_names, devtype, tree, filename, failures, batch)
                 else:
                     logger.warning('update_objects: Unsupported action \'{}\' for type \'{}\' name \'{}\', (contact your nearest Security Engineering resource). skipping...'.format(action, str(type(o)), o.name))
+
+        if batch.pending:
+            create_palo_batch(args, logger, batch, devtype, filename, failures)
+        if batch.patches:
+            update_palo_patches(args, logger, batch, devtype, filename, failures, live_objects)
+        if batch.groups:
+            update_palo_groups(args, logger, batch, devtype, filename, failures, live_objects)
+        if batch.dips:
+            update_palo_dips(args, logger, batch, tree, devtype, filename, failures, existing_dip_names)
     #else:
         #logger.warning('update_objects: Nothing to Update {} (contact your nearest Security Engineering resource). skipping...'.format(action))
 
+def get_palo_rulebase(tree):
+
+    # takes pandevice object and returns its Rulebase child, as firewall rules live below it, or the object itself if it has none (e.g. rules not collected)
+
+    for child in tree.children:
+        if type(child) is Rulebase:
+            return child
+
+    return tree
+
+def order_palo_objects(objects, args, logger):
+
+    # takes list of objects to create and returns them in dependency order (topological sort) - anything referred to by another object in the list comes first
+    # otherwise CSV order is kept. objects in a reference loop cannot be created in any order so they are left at the end in CSV order
+
+    position = {o.name: i for i, o in enumerate(objects)}
+    dependants = defaultdict(list)
+    waiting = [0] * len(objects)
+
+    for i, o in enumerate(objects):
+        for reference in get_palo_references(o):
+            j = position.get(reference)
+            if j is not None and j != i:
+                dependants[j].append(i)
+                waiting[i] += 1
+
+    # always take the earliest ready object in the CSV so independent objects keep their order
+    ready = [i for i in range(len(objects)) if not waiting[i]]
+    heapq.heapify(ready)
+    ordered = list()
+
+    while ready:
+        i = heapq.heappop(ready)
+        ordered.append(i)
+        for j in dependants[i]:
+            waiting[j] -= 1
+            if not waiting[j]:
+                heapq.heappush(ready, j)
+
+    if len(ordered) < len(objects):
+        looped = [i for i in range(len(objects)) if waiting[i]]
+        logger.warning("Reference loop between objects \'{}\'. These will be created in CSV order and may fail.".format(', '.join(objects[i].name for i in looped)))
+        ordered.extend(looped)
+
+    if args.verbose == 3 and ordered != sorted(ordered):
+        logger.debug('order_palo_objects: creation order {}'.format([objects[i].name for i in ordered]))
+
+    return [objects[i] for i in ordered]
+
+def get_palo_references(object):
+
+    # takes a pandevice object and returns set of names it refers to (group members and tags)
+
+    references = set()
+
+    if issubclass(type(object), AddressGroup):
+        references.update(pandevice.string_or_list(object.static_value or list()))
+    elif issubclass(type(object), (ServiceGroup, ApplicationGroup)):
+        references.update(pandevice.string_or_list(object.value or list()))
+
+    if getattr(object, 'tag', None):
+        references.update(pandevice.string_or_list(object.tag))
+
+    return references
+
+def log_palo_references(args, logger, object, names, devtype, device):
+
+    # takes a pandevice object and a NameScope, logs the layer each name the object refers to was found in (e.g. 'predefined', 'shared', 'dbedit')
+
+    references = get_palo_references(object)
+
+    if issubclass(type(object), (SecurityRule, NatRule)):
+        for variable in ('fromzone', 'tozone', 'source', 'destination', 'application', 'service', 'to_interface'):
+            if getattr(object, variable, None):
+                references.update(pandevice.string_or_list(getattr(object, variable)))
+
+    for name in sorted(references):
+        logger.debug('{} \'{}\': \'{}\' refers to \'{}\' found in \'{}\''.format(devtype, device, object.name, name, names.resolve(name) or 'nowhere'))
+
 ####################################################################################
 #
 # Create Functions
 #
 ####################################################################################
 
-def create_palo_nat(args, logger, new_nat_rule, rules, zones, addresses, address_groups, services, service_groups, interfaces, tags, devtype, rulebase, device, failures):
+def create_palo_nat(args, logger, new_nat_rule, rules, zones, addresses, address_groups, services, service_groups, interfaces, tags, devtype, rulebase, device, failures, batch=None):
 
     # takes a Rulebase object 'new_nat_rule' and checks dependencies etc...
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also <class 'str'>
 
-    # add in 'any' where appropriate as this is a valid option
-    zones.add('any')
-    addresses.add('any')
-    services.add('any')
-    interfaces.add('any')
+    # add in 'any' where appropriate as this is a valid option, as a layer of its own so the callers names are left alone
+    zones = NameScope(('live', zones), ('fixed', {'any'}))
+    addresses = NameScope(('live', addresses), ('fixed', {'any'}))
+    services = NameScope(('live', services), ('fixed', {'any'}))
+    interfaces = NameScope(('live', interfaces), ('fixed', {'any'}))
 
     if not args.no_checks:
         # check not already existing
@@ -439,9 +770,9 @@ def create_palo_nat(args, logger, new_nat_rule, rules, zones, addresses, address
                                             logger.warning("{} \'{}\': Not attempting to create NatRule \'{}\'. Invalid tag \'{}\'! Skipping...".format(devtype, device, new_nat_rule, tag))
                                             break
                                     else:
-                                        create_palo_object(args, logger, new_nat_rule, 'NatRule', rulebase, device, devtype, failures)
+                                        create_palo_object(args, logger, new_nat_rule, 'NatRule', rulebase, device, devtype, failures, batch)
                                 else:
-                                    create_palo_object(args, logger, new_nat_rule, 'NatRule', rulebase, device, devtype, failures)
+                                    create_palo_object(args, logger, new_nat_rule, 'NatRule', rulebase, device, devtype, failures, batch)
                             else:
                                 logger.warning("{} \'{}\': Not attempting to create NatRule \'{}\'. Invalid interface \'{}\'! Skipping...".format(devtype, device, new_nat_rule, new_nat_rule.to_interface))
                         else:
@@ -451,19 +782,18 @@ def create_palo_nat(args, logger, new_nat_rule, rules, zones, addresses, address
     else:
         if not args.quiet:
             logger.info("{} \'{}\': \'--no-checks\' requested while attempting to create NatRule \'{}\'. Watch for errors...".format(devtype, device, new_nat_rule))
-        create_palo_object(args, logger, new_nat_rule, 'NatRule', rulebase, device, devtype, failures)
+        create_palo_object(args, logger, new_nat_rule, 'NatRule', rulebase, device, devtype, failures, batch)
 
-def create_palo_rule(args, logger, new_sec_rule, rules, zones, addresses, address_groups, services, service_groups, applications, application_groups, tags, devtype, rulebase, device, failures):
+def create_palo_rule(args, logger, new_sec_rule, rules, zones, addresses, address_groups, services, service_groups, applications, application_groups, tags, devtype, rulebase, device, failures, batch=None):
 
     # takes a SecurityRule object 'new_sec_rule' and checks dependencies etc...
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also <class 'str'>
 
-    # add in 'any' (or other fixed values) where appropriate as this is a valid option
-    zones.add('any')
-    addresses.add('any')
-    applications.add('any')
-    services.add('any')
-    services.add('application-default')
+    # add in 'any' (or other fixed values) where appropriate as this is a valid option, as a layer of its own so the callers names are left alone
+    zones = NameScope(('live', zones), ('fixed', {'any'}))
+    addresses = NameScope(('live', addresses), ('fixed', {'any'}))
+    applications = NameScope(('live', applications), ('fixed', {'any'}))
+    services = NameScope(('live', services), ('fixed', {'any', 'application-default'}))
 
     if not args.no_checks:
         # check not already existing
@@ -504,29 +834,30 @@ def create_palo_rule(args, logger, new_sec_rule, rules, zones, addresses, addres
                                                 logger.warning("{} \'{}\': Not attempting to create SecurityRule \'{}\'. Invalid tag \'{}\'! Skipping...".format(devtype, device, new_sec_rule, tag))
                                                 break
                                         else:
-                                            create_palo_object(args, logger, new_sec_rule, 'SecurityRule', rulebase, device, devtype, failures)
+                                            create_palo_object(args, logger, new_sec_rule, 'SecurityRule', rulebase, device, devtype, failures, batch)
                                     else:
-                                        create_palo_object(args, logger, new_sec_rule, 'SecurityRule', rulebase, device, devtype, failures)
+                                        create_palo_object(args, logger, new_sec_rule, 'SecurityRule', rulebase, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create SecurityRule \'{}\'. Already exists! Skipping...".format(devtype, device, new_sec_rule))
     else:
-        create_palo_object(args, logger, new_sec_rule, 'SecurityRule', rulebase, device, devtype, failures)
+        create_palo_object(args, logger, new_sec_rule, 'SecurityRule', rulebase, device, devtype, failures, batch)
 
-def create_palo_application(args, logger, new_application, applications, devtype, tree, device, failures):
+def create_palo_application(args, logger, new_application, applications, devtype, tree, device, failures, batch=None):
 
     # takes an Application object 'new_application' and checks dependencies etc...
 
     if not args.no_checks:
         if new_application.name not in applications:
-            create_palo_object(args, logger, new_application, 'Application', tree, device, devtype, failures)
+            create_palo_object(args, logger, new_application, 'Application', tree, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create Application \'{}\'. Already exists! Skipping...".format(devtype, device, new_application))
     else:
-        create_palo_object(args, logger, new_application, 'Application', tree, device, devtype, failures)
+        create_palo_object(args, logger, new_application, 'Application', tree, device, devtype, failures, batch)
 
-def create_palo_application_group(args, logger, new_application_group, application_groups, applications, devtype, tree, device, failures):
+def create_palo_application_group(args, logger, new_application_group, application_groups, applications, devtype, tree, device, failures, batch=None):
 
     # takes an ApplicationGroup object 'new_application_group' and checks dependencies etc...
+    # returns True once the group is created (or queued, or would be in test mode) so groups referring to it may follow
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also <class 'str'>
     # check not already existing
 
@@ -540,17 +871,18 @@ def create_palo_application_group(args, logger, new_application_group, applicati
                         break
                 else:
                     # here we can check for dependent apps
-                    create_palo_object(args, logger, new_application_group, 'ApplicationGroup', tree, device, devtype, failures)
+                    return create_palo_object(args, logger, new_application_group, 'ApplicationGroup', tree, device, devtype, failures, batch)
             else:
                 logger.warning("{} \'{}\': Not attempting to create ApplicationGroup \'{}\'. No members! Skipping...".format(devtype, device, new_application_group))
         else:
             logger.warning("{} \'{}\': Not attempting to create ApplicationGroup \'{}\'. Already exists! Skipping...".format(devtype, device, new_application_group))
     else:
-        create_palo_object(args, logger, new_application_group, 'ApplicationGroup', tree, device, devtype, failures)
+        return create_palo_object(args, logger, new_application_group, 'ApplicationGroup', tree, device, devtype, failures, batch)
 
-def create_palo_address_group(args, logger, new_address_group, address_groups, tags, addresses, devtype, tree, device, failures):
+def create_palo_address_group(args, logger, new_address_group, address_groups, tags, addresses, devtype, tree, device, failures, batch=None):
 
     # takes an AddressGroup object 'new_address_group' and checks dependencies etc...
+    # returns True once the group is created (or queued, or would be in test mode) so groups referring to it may follow
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also a <class 'str'>
 
     if not args.no_checks:
@@ -571,7 +903,7 @@ def create_palo_address_group(args, logger, new_address_group, address_groups, t
                                 logger.warning("{} \'{}\': Not attempting to create AddressGroup \'{}\'. Missing member \'{}\'! Skipping...".format(devtype, device, new_address_group, member))
                                 break
                         else:
-                            create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures)
+                            return create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures, batch)
                     elif new_address_group.dynamic_value:
                         # we are a dynamic group - check each tag filter exists tricky bec dynamic_value = (str)
                         tmp = new_address_group.dynamic_value.replace("'", "")
@@ -582,7 +914,7 @@ def create_palo_address_group(args, logger, new_address_group, address_groups, t
                                 logger.warning("{} \'{}\': Not attempting to create AddressGroup \'{}\'. Missing filter \'{}\'! Skipping...".format(devtype, device, new_address_group, pattern))
                                 break
                         else:
-                            create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures)
+                            return create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures, batch)
             else:
                 # no tags requested, check for group type
                 if new_address_group.static_value:
@@ -592,7 +924,7 @@ def create_palo_address_group(args, logger, new_address_group, address_groups, t
                             logger.warning("{} \'{}\': Not attempting to create AddressGroup \'{}\'. Missing member \'{}\'! Skipping...".format(devtype, device, new_address_group, member))
                             break
                     else:
-                        create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures)
+                        return create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures, batch)
                 elif new_address_group.dynamic_value:
                     # we are a dynamic group - check each tag filter exists tricky bec dynamic_value = (str)
                     tmp = new_address_group.dynamic_value.replace("'", "")
@@ -603,13 +935,13 @@ def create_palo_address_group(args, logger, new_address_group, address_groups, t
                             logger.warning("{} \'{}\': Not attempting to create AddressGroup \'{}\'. Missing filter \'{}\'! Skipping...".format(devtype, device, new_address_group, pattern))
                             break
                     else:
-                        create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures)
+                        return create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create AddressGroup \'{}\'. Already exists! Skipping...".format(devtype, device, new_address_group))
     else:
-        create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures)
+        return create_palo_object(args, logger, new_address_group, 'AddressGroup', tree, device, devtype, failures, batch)
 
-def create_palo_address(args, logger, new_address, addresses, tags, devtype, tree, device, failures):
+def create_palo_address(args, logger, new_address, addresses, tags, devtype, tree, device, failures, batch=None):
 
     # takes an AddressObject object 'new_address' and checks dependencies etc...
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also a <class 'str'>
@@ -625,16 +957,16 @@ def create_palo_address(args, logger, new_address, addresses, tags, devtype, tre
                         break
                 else:
                     # all tags were found, create AddressObject
-                    create_palo_object(args, logger, new_address, 'AddressObject', tree, device, devtype, failures)
+                    create_palo_object(args, logger, new_address, 'AddressObject', tree, device, devtype, failures, batch)
             else:
                 # create AddressObject
-                create_palo_object(args, logger, new_address, 'AddressObject', tree, device, devtype, failures)
+                create_palo_object(args, logger, new_address, 'AddressObject', tree, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create AddressObject \'{}\'. Already exists! Skipping...".format(devtype, device, new_address))
     else:
-        create_palo_object(args, logger, new_address, 'AddressObject', tree, device, devtype, failures)
+        create_palo_object(args, logger, new_address, 'AddressObject', tree, device, devtype, failures, batch)
 
-def create_palo_service(args, logger, new_service, services, tags, devtype, tree, device, failures):
+def create_palo_service(args, logger, new_service, services, tags, devtype, tree, device, failures, batch=None):
 
     # takes a ServiceObject object 'new_service' and checks dependencies etc...
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also a <class 'str'>
@@ -650,18 +982,19 @@ def create_palo_service(args, logger, new_service, services, tags, devtype, tree
                         break
                 else:
                     # all tags were found, create ServiceObject
-                    create_palo_object(args, logger, new_service, 'ServiceObject', tree, device, devtype, failures)
+                    create_palo_object(args, logger, new_service, 'ServiceObject', tree, device, devtype, failures, batch)
             else:
                 # create ServiceObject
-                create_palo_object(args, logger, new_service, 'ServiceObject', tree, device, devtype, failures)
+                create_palo_object(args, logger, new_service, 'ServiceObject', tree, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create ServiceObject \'{}\'. Already exists! Skipping...".format(devtype, device, new_service))
     else:
-        create_palo_object(args, logger, new_service, 'ServiceObject', tree, device, devtype, failures)
+        create_palo_object(args, logger, new_service, 'ServiceObject', tree, device, devtype, failures, batch)
 
-def create_palo_service_group(args, logger, new_service_group, service_groups, tags, services, devtype, tree, device, failures):
+def create_palo_service_group(args, logger, new_service_group, service_groups, tags, services, devtype, tree, device, failures, batch=None):
 
     # takes a ServiceGroup object 'new_service_group' and checks dependencies etc...
+    # returns True once the group is created (or queued, or would be in test mode) so groups referring to it may follow
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also a <class 'str'>
 
     if not args.no_checks:
@@ -681,7 +1014,7 @@ def create_palo_service_group(args, logger, new_service_group, service_groups, t
                                 logger.warning("{} \'{}\': Not attempting to create ServiceGroup \'{}\'. Missing member \'{}\'! Skipping...".format(devtype, device, new_service_group, member))
                                 break
                         else:
-                            create_palo_object(args, logger, new_service_group, 'ServiceGroup', tree, device, devtype, failures)
+                            return create_palo_object(args, logger, new_service_group, 'ServiceGroup', tree, device, devtype, failures, batch)
                     else:
                         logger.warning("{} \'{}\': Not attempting to create ServiceGroup \'{}\'. No members! Skipping...".format(devtype, device, new_service_group))
             else:
@@ -692,15 +1025,15 @@ def create_palo_service_group(args, logger, new_service_group, service_groups, t
                             logger.warning("{} \'{}\': Not attempting to create ServiceGroup \'{}\'. Missing member \'{}\'! Skipping...".format(devtype, device, new_service_group, member))
                             break
                     else:
-                        create_palo_object(args, logger, new_service_group, 'ServiceGroup', tree, device, devtype, failures)
+                        return create_palo_object(args, logger, new_service_group, 'ServiceGroup', tree, device, devtype, failures, batch)
                 else:
                     logger.warning("{} \'{}\': Not attempting to create ServiceGroup \'{}\'. No members! Skipping...".format(devtype, device, new_service_group))
         else:
             logger.warning("{} \'{}\': Not attempting to create ServiceGroup \'{}\'. Already exists! Skipping...".format(devtype, device, new_service_group))
     else:
-        create_palo_object(args, logger, new_service_group, 'ServiceGroup', tree, device, devtype, failures)
+        return create_palo_object(args, logger, new_service_group, 'ServiceGroup', tree, device, devtype, failures, batch)
 
-def create_palo_tag(args, logger, new_tag, tags, devtype, tree, device, failures):
+def create_palo_tag(args, logger, new_tag, tags, devtype, tree, device, failures, batch=None):
 
     # takes a Tag object 'new_tag' and checks dependencies etc...
     # note its important here to compare same types. set contains <class 'str'> so use a.name as that is also a <class 'str'>
@@ -708,103 +1041,33 @@ def create_palo_tag(args, logger, new_tag, tags, devtype, tree, device, failures
     if not args.no_checks:
         # check not already existing
         if new_tag.name not in tags:
-            create_palo_object(args, logger, new_tag, 'Tag', tree, device, devtype, failures)
+            create_palo_object(args, logger, new_tag, 'Tag', tree, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create Tag \'{}\'. Already exists! Skipping...".format(devtype, device, new_tag))
     else:
-        create_palo_object(args, logger, new_tag, 'Tag', tree, device, devtype, failures)
+        create_palo_object(args, logger, new_tag, 'Tag', tree, device, devtype, failures, batch)
 
-def create_palo_dip(args, logger, new_dip, dips, devtype, tree, device, failures):
+def create_palo_dip(args, logger, new_dip, dips, devtype, tree, device, failures, batch=None):
 
     # takes a Dip object and checks dependencies etc...
+    # 'dips' is the ip -> set of tags index from 'get_palo_dips', None if the live registered-ips could not be read in full
 
-    if not args.no_checks:
-        # check not already existing
-        if new_dip.name not in dips:
-            create_palo_object(args, logger, new_dip, 'Dip', tree, device, devtype, failures)
+    if not args.no_checks and dips is not None:
+        # check not already existing, e.g. every ip already carries every tag
+        tags = set(pandevice.string_or_list(new_dip.tag))
+        if not all(tags <= dips.get(ip, set()) for ip in pandevice.string_or_list(new_dip.ip)):
+            create_palo_object(args, logger, new_dip, 'Dip', tree, device, devtype, failures, batch, dips)
         else:
             logger.warning("{} \'{}\': Not attempting to create Dip \'{}\'. Already exists! Skipping...".format(devtype, device, new_dip))
     else:
-        create_palo_object(args, logger, new_dip, 'Dip', tree, device, devtype, failures)
-
-def create_palo_objects(args, logger, dbedit_objects, live_objects, subclass, tree, device, devtype, failures):
-
-    # takes list of 'dbedit objects' and list of 'live objects' and calls 'create_palo_object' if not existing
-
-    if dbedit_objects:
-        if not args.quiet:
-            logger.info("{} \'{}\', dbedit create requests: {} = \'{}\'".format(devtype, device, subclass, len(dbedit_objects)))
-        for d in dbedit_objects:
-            if not args.no_checks:
-                for l in live_objects:
-                    # check if the live object matches the name and type of dbedit object (e.g. object already exists)
-                    if d.name == l.name:
-                        if subclass == 'AddressObject':
-                            if issubclass(type(l), AddressObject):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'AddressGroup':
-                            if issubclass(type(l), AddressGroup):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'ApplicationContainer':
-                            if issubclass(type(l), ApplicationContainer):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'ApplicationFilter':
-                            if issubclass(type(l), ApplicationFilter):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'ApplicationObject':
-                            if issubclass(type(l), ApplicationObject):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'ApplicationGroup':
-                            if issubclass(type(l), ApplicationGroup):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'ServiceObject':
-                            if issubclass(type(l), ServiceObject):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'ServiceGroup':
-                            if issubclass(type(l), ServiceGroup):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'Tag':
-                            if issubclass(type(l), Tag):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'Dip':
-                            if issubclass(type(l), Dip):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'StaticRoute':
-                            if issubclass(type(l), StaticRoute):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'SecurityRule':
-                            if issubclass(type(l), SecurityRule):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        elif subclass == 'NatRule':
-                            if issubclass(type(l), NatRule):
-                                logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Already exists! Skipping...".format(devtype, device, subclass, d.name))
-                                break
-                        else:
-                            logger.warning("{} \'{}\': Not attempting to create {} \'{}\'. Unknown subclass but name already used! Skipping...".format(devtype, device, subclass, d.name))
-                            continue
-                else:
-                    # object does not already exist
-                    create_palo_object(args, logger, d, subclass, tree, device, devtype, failures)
-            else:
-                create_palo_object(args, logger, d, subclass, tree, device, devtype, failures)
-        else:
-            logger.warning("{} \'{}\': No objects of type \'{}\' to create.".format(devtype, device, subclass))
+        create_palo_object(args, logger, new_dip, 'Dip', tree, device, devtype, failures, batch, dips)
 
-def create_palo_object(args, logger, object, subclass, tree, device, devtype, failures):
+def create_palo_object(args, logger, object, subclass, tree, device, devtype, failures, batch=None, registered_ips=None):
 
     # takes a single object and creates as directed attaching to 'tree' in the process
+    # if a CreateBatch 'batch' is supplied (and enabled) the object is queued instead and pushed later by 'create_palo_batch'
+    # returns False if the create failed, True otherwise (queued objects are only sent when the batch is flushed)
+    # 'registered_ips' is the ip -> set of tags index from 'get_palo_dips', kept in step with the Dip registrations sent
 
     if object:
         if args.test:
@@ -814,11 +1077,19 @@ def create_palo_object(args, logger, object, subclass, tree, device, devtype, fa
             if not args.quiet:
                 logger.info("{} \'{}\': creating {} \'{}\'...".format(devtype, device, subclass, object.name))
             if subclass == 'Dip':
-                try:
-                    tree.userid.register(object.ip, object.tag)
-                except Exception as e:
-                    logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
-                    failures.add(object.name)
+                if batch is not None and batch.dip_size > 0:
+                    batch.add_dip('register', object)
+                else:
+                    try:
+                        tree.userid.register(object.ip, object.tag)
+                        set_palo_dip_index(registered_ips, 'register', object)
+                    except Exception as e:
+                        logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+                        failures.add(object.name)
+                        return False
+            elif batch is not None and batch.size > 0:
+                tree.add(object)
+                batch.add(object)
             else:
                 tree.add(object)
                 try:
@@ -826,20 +1097,157 @@ def create_palo_object(args, logger, object, subclass, tree, device, devtype, fa
                 except Exception as e:
                     logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
                     failures.add(object.name)
+                    return False
     else:
         logger.warning("{} \'{}\': No object of type \'{}\' to create.".format(devtype, device, subclass))
+        return False
 
-def create_palo_route(args, logger, new_route, routes, devtype, tree, device, failures):
+    return True
+
+def create_palo_batch(args, logger, batch, devtype, device, failures):
+
+    # takes a CreateBatch object and pushes the queued objects with a single 'set' API call per chunk of 'batch.size' objects sharing an xpath
+    # the 'set' is made against the parent xpath with a wrapper element, in the same way pandevice does for 'create_similar()'
+    # if a chunk fails fall back to 'create()' per object so that 'failures' names the exact object that broke
+
+    for xpath, objects in batch.pending.items():
+        xpath_tokens = xpath.split('/')
+        new_root = xpath_tokens.pop()
+        parent_xpath = '/'.join(xpath_tokens)
+
+        for n in range(0, len(objects), batch.size):
+            chunk = objects[n:n + batch.size]
+            shared_root = ET.Element(new_root)
+            for o in chunk:
+                shared_root.append(o.element())
+
+            if args.verbose:
+                logger.info("{} \'{}\': batch creating \'{}\' {} objects...".format(devtype, device, len(chunk), str(type(chunk[0]).__name__)))
+
+            try:
+                pan_device = chunk[0].nearest_pandevice()
+                pan_device.set_config_changed()
+                pan_device.xapi.set(parent_xpath, ET.tostring(shared_root, encoding='utf-8'), retry_on_peer=chunk[0].HA_SYNC)
+            except Exception as e:
+                logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+                logger.warning("{} \'{}\': Batch create of \'{}\' {} objects failed. Retrying one at a time...".format(devtype, device, len(chunk), str(type(chunk[0]).__name__)))
+                for o in chunk:
+                    try:
+                        o.create()
+                    except Exception as e:
+                        logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+                        failures.add(o.name)
+
+    batch.pending.clear()
+
+def sync_palo_dips(args, logger, dips, registered_ips, devtype, tree, device, failures, batch=None):
+
+    # takes list of Dip objects giving the desired registered-ips and the ip -> set of tags index of the live ones from 'get_palo_dips'
+    # registers only the missing ip/tags and unregisters only the live ip/tags that are not wanted, so the User-ID load follows the churn not the table size
+    # the live set must have been read in full, otherwise wanted registrations would look missing and nothing could be safely unregistered
+
+    if registered_ips is None:
+        logger.error("{} \'{}\': Cannot sync DIPs, the live registered-ips could not be read in full. Skipping...".format(devtype, device))
+        failures.add('dip-sync')
+        return
+
+    desired = defaultdict(set)
+    for o in dips:
+        for ip in pandevice.string_or_list(o.ip):
+            desired[ip].update(pandevice.string_or_list(o.tag))
+
+    registers = list()
+    for ip, tags in desired.items():
+        missing = tags - registered_ips.get(ip, set())
+        if missing:
+            registers.append(Dip(ip=ip, tag=sorted(missing)))
+
+    unregisters = list()
+    for ip, tags in registered_ips.items():
+        unwanted = tags - desired.get(ip, set())
+        if unwanted:
+            unregisters.append(Dip(ip=ip, tag=sorted(unwanted)))
+
+    if not args.quiet:
+        logger.info("{} \'{}\': DIP sync, \'{}\' ips to register, \'{}\' ips to unregister, \'{}\' wanted ips in total".format(devtype, device, len(registers), len(unregisters), len(desired)))
+
+    for o in unregisters:
+        delete_palo_dip(args, logger, o, registered_ips, devtype, tree, device, failures, batch)
+
+    for o in registers:
+        create_palo_object(args, logger, o, 'Dip', tree, device, devtype, failures, batch, registered_ips)
+
+def update_palo_dips(args, logger, batch, tree, devtype, device, failures, registered_ips=None):
+
+    # takes a CreateBatch object and sends the queued registered-ip updates in one User-ID message per chunk of 'batch.dip_size' entries
+    # if a message fails fall back to one message per entry so that 'failures' names the exact Dip that broke
+    # 'registered_ips' is the ip -> set of tags index from 'get_palo_dips', updated with every entry that was sent
+
+    for n in range(0, len(batch.dips), batch.dip_size):
+        chunk = batch.dips[n:n + batch.dip_size]
+
+        if args.verbose:
+            logger.info("{} \'{}\': sending \'{}\' registered-ip updates in one User-ID message...".format(devtype, device, len(chunk)))
+
+        try:
+            tree.userid.batch_start()
+            for action, o in chunk:
+                if action == 'register':
+                    tree.userid.register(o.ip, o.tag)
+                else:
+                    tree.userid.unregister(ip=o.ip, tags=o.tag)
+            tree.userid.batch_end()
+            for action, o in chunk:
+                set_palo_dip_index(registered_ips, action, o)
+        except Exception as e:
+            logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+            logger.warning("{} \'{}\': User-ID message with \'{}\' registered-ip updates failed. Retrying one at a time...".format(devtype, device, len(chunk)))
+            # discard anything left of the failed message so the retries are sent straight away
+            tree.userid.batch_start()
+            tree.userid.batch_end()
+            for action, o in chunk:
+                try:
+                    if action == 'register':
+                        tree.userid.register(o.ip, o.tag)
+                    else:
+                        tree.userid.unregister(ip=o.ip, tags=o.tag)
+                    set_palo_dip_index(registered_ips, action, o)
+                except Exception as e:
+                    logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+                    failures.add(o.name)
+
+    del batch.dips[:]
+
+def set_palo_dip_index(registered_ips, action, o):
+
+    # takes the ip -> set of tags index from 'get_palo_dips' and a Dip just registered or unregistered on the device, and applies the same change to the index
+    # the index is read once per VSYS so this keeps later actions of the same run (e.g. 'sync' after 'create') in step with the device
+
+    if registered_ips is None:
+        return
+
+    tags = set(pandevice.string_or_list(o.tag or list()))
+
+    for ip in pandevice.string_or_list(o.ip):
+        if action == 'register':
+            registered_ips.setdefault(ip, set()).update(tags)
+        elif ip in registered_ips and tags:
+            # pandevice sends nothing for an unregister without tags, so the index is left alone too
+            registered_ips[ip] -= tags
+            if not registered_ips[ip]:
+                del registered_ips[ip]
+
+def create_palo_route(args, logger, new_route, routes, devtype, tree, device, failures, batch=None):
 
     # takes a StaticRoute object and checks dependencies etc...
 
     if not args.no_checks:
         if new_route.name not in routes:
-            create_palo_object(args, logger, new_route, 'StaticRoute', tree, device, devtype, failures)
+            create_palo_object(args, logger, new_route, 'StaticRoute', tree, device, devtype, failures, batch)
         else:
             logger.warning("{} \'{}\': Not attempting to create Tag \'{}\'. Already exists! Skipping...".format(devtype, device, new_route))
     else:
-        create_palo_object(args, logger, new_route, 'StaticRoute', tree, device, devtype, failures)
+        create_palo_object(args, logger, new_route, 'StaticRoute', tree, device, devtype, failures, batch)
 
 ####################################################################################
 #
@@ -847,147 +1255,154 @@ def create_palo_route(args, logger, new_route, routes, devtype, tree, device, fa
 #
 ####################################################################################
 
-def add_to_palo_group(args, logger, o, available_groups, available_members, devtype, subclass, tree, device, failures):
+def add_to_palo_group(args, logger, o, available_groups, available_members, devtype, subclass, tree, device, failures, batch=None, live_objects=None):
 
-    # takes a ModifyGroup object 'o', finds it in the Tree per its Namespace (subclass) and calls 'add_member'
-    # issue here is that you need the correct pandevice object in the tree in order to edit it.
-    # second issue is that the object might not be in the tree so try to refresh it from live device
+    # takes a ModifyGroup object 'o' and adds its members to the group of Namespace (subclass) via 'modify_palo_group'
+    # if a CreateBatch 'batch' is supplied the change is queued instead so every change to the same group is written once by 'update_palo_groups'
 
-    group = tree.find(o.name, subclass)
-    if not issubclass(type(group), subclass):
-        # 'NoneType' returned from find method if object not in Tree - try to refresh it from live device
-        group = subclass(o.name)
-        tree.add(group)
+    if batch is not None:
+        batch.add_modification(subclass, tree, available_members, o)
+        return
 
-    try:
-        group.refresh()
-        if issubclass(type(group), AddressGroup):
-            existing_members = set(group.static_value)
-        else:
-            existing_members = set(group.value)
+    modify_palo_group(args, logger, [o], available_members, devtype, subclass, tree, device, failures, live_objects)
 
-        for member in o.members:
-            if member not in existing_members:
-                add_palo_member(args, logger, o, group, member, devtype, device, failures)
-            else:
-                logger.warning("{} \'{}\': Member \'{}\' already in group \'{}\'! Skipping...".format(devtype, device, member, o.name))
+def remove_from_palo_group(args, logger, o, available_groups, available_members, devtype, subclass, tree, device, failures, batch=None, live_objects=None):
 
-    except Exception as e:
-        logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
-        failures.add(o.name)
-        logger.warning("{} \'{}\': Cannot add to group {} \'{}\'. FAILED!".format(devtype, device, str(type(group).__name__), o.name))
+    # takes a ModifyGroup object 'o' and removes its members from the group of Namespace (subclass) via 'modify_palo_group'
+    # if a CreateBatch 'batch' is supplied the change is queued instead so every change to the same group is written once by 'update_palo_groups'
 
-def add_palo_member(args, logger, o, group, member, devtype, device, failures):
+    if batch is not None:
+        batch.add_modification(subclass, tree, available_members, o)
+        return
 
-    # tries to add member to group
-    # removes placeholder objects if found
+    modify_palo_group(args, logger, [o], available_members, devtype, subclass, tree, device, failures, live_objects)
 
-    try:
-        if issubclass(type(group), AddressGroup):
-            group.static_value.append(member)
-        else:
-            group.value.append(member)
-
-        # remove placeholder objects
-        if issubclass(type(group), AddressGroup):
-            if len(group.static_value) > 1:
-                for m in group.static_value:
-                    if m == 'placeholder':
-                        group.static_value.remove(m)
-        elif issubclass(type(group), ServiceGroup):
-            if len(group.value) > 1:
-                for m in group.value:
-                    if m == 'placeholder-service':
-                        group.value.remove(m)
-
-        # Use of 'create()' here simply changes the required variable.
-        if not args.test:
-            group.create()
-            if not args.quiet:
-                logger.info("{} \'{}\': Successfully added \'{}\' to group \'{}\'. OK!".format(devtype, device, member, o.name))
-        else:
-            if not args.quiet:
-                logger.info("{} \'{}\': TEST MODE - not added \'{}\' to group \'{}\'. TEST!".format(devtype, device, member, o.name))
+def update_palo_groups(args, logger, batch, devtype, device, failures, live_objects=None):
 
-    except Exception as e:
-                    logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
-                    failures.add(o.name)
-                    logger.warning("{} \'{}\': Cannot add \'{}\' to group \'{}\'. FAILED!".format(devtype, device, member, o.name))
+    # takes CreateBatch 'batch' and writes each queued group once, with all of its queued member changes applied
+
+    for (subclass, name), (tree, available_members, modifications) in batch.groups.items():
+        modify_palo_group(args, logger, modifications, available_members, devtype, subclass, tree, device, failures, live_objects)
 
-def remove_from_palo_group(args, logger, o, available_groups, available_members, devtype, subclass, tree, device, failures):
+def modify_palo_group(args, logger, modifications, available_members, devtype, subclass, tree, device, failures, live_objects=None):
 
-    # takes a ModifyGroup object 'o', finds it in the Tree per its Namespace (subclass) and calls 'remove_palo_member'
+    # takes list of ModifyGroup objects for one group, in CSV order, reads the group once, applies every add and remove to its member list and writes it back once
     # issue here is that you need the correct pandevice object in the tree in order to edit it.
     # second issue is that the object might not be in the tree so try to refresh it from live device
+    # removes placeholder objects once members are added, adds placeholder objects (creates if not found) so does not leave an empty group
+    # empty ApplicationGroup = + ping
+    # empty ServiceGroup = + placeholder-service (TCP port 0)
+    # empty AddressGroup = + placeholder
 
-    group = tree.find(o.name, subclass)
+    name = modifications[0].name
+
+    group = tree.find(name, subclass)
     if not issubclass(type(group), subclass):
         # 'NoneType' returned from find method if object not in Tree - try to refresh it from live device
-        group = subclass(o.name)
+        group = subclass(name)
         tree.add(group)
 
-    try:
-        group.refresh()
-        if issubclass(type(group), AddressGroup):
-            existing_members = set(group.static_value)
-        else:
-            existing_members = set(group.value)
-
-        for member in o.members:
-            if member in existing_members:
-                remove_palo_member(args, logger, o, group, member, available_members, tree, devtype, device, failures)
-            else:
-                logger.warning("{} \'{}\': Member \'{}\' not in group \'{}\'! Skipping...".format(devtype, device, member, o.name))
-
-    except Exception as e:
-        logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
-        failures.add(o.name)
-        logger.warning("{} \'{}\': Cannot attempt to remove from group {} \'{}\'. FAILED!".format(devtype, device, str(type(group).__name__), o.name))
+    if issubclass(type(group), AddressGroup):
+        variable = 'static_value'
+    else:
+        variable = 'value'
 
-def remove_palo_member(args, logger, o, group, member, available_members, tree, devtype, device, failures):
+    try:
+        refresh_palo_object(group, live_objects)
+        members = list(pandevice.string_or_list_or_none(getattr(group, variable)))
+
+        added = list()
+        removed = list()
+        for o in modifications:
+            for member in o.members or list():
+                if o.action == 'addtogroup':
+                    if member not in members:
+                        members.append(member)
+                        added.append(member)
+                    else:
+                        logger.warning("{} \'{}\': Member \'{}\' already in group \'{}\'! Skipping...".format(devtype, device, member, name))
+                elif member in members:
+                    members.remove(member)
+                    removed.append(member)
+                else:
+                    logger.warning("{} \'{}\': Member \'{}\' not in group \'{}\'! Skipping...".format(devtype, device, member, name))
 
-    # tries to remove member from group
-    # adds placeholder objects (creates if not found) so does not leave and empty group
-    # empty ApplicationGroup = + ping
-    # empty ServiceGroup = + placeholder-service (TCP port 0)
-    # empty AddressGroup = + placeholder
+        if not added and not removed:
+            return
 
-    try:
-        if issubclass(type(group), AddressGroup):
-            group.static_value.remove(member)
-        else:
-            group.value.remove(member)
+        # remove placeholder objects, counted as removed members so the group is replaced rather than merged with the device
+        if added and len(members) > 1:
+            if issubclass(type(group), AddressGroup):
+                placeholder = 'placeholder'
+            elif issubclass(type(group), ServiceGroup):
+                placeholder = 'placeholder-service'
+            else:
+                placeholder = None
+            if placeholder in members:
+                members.remove(placeholder)
+                removed.append(placeholder)
 
         # don't leave empty groups  - add placeholders
-        if issubclass(type(group), AddressGroup):
-            if len(group.static_value) == 0:
+        if not members:
+            if issubclass(type(group), AddressGroup):
                 if 'placeholder' not in available_members and not tree.find('placeholder', AddressObject):
                     p = AddressObject(name='placeholder', value='169.254.1.1', type='ip-netmask', description='placeholder object for empty groups')
                     create_palo_object(args, logger, p, 'AddressObject', tree, device, devtype, failures)
-                group.static_value.append('placeholder')
-        elif issubclass(type(group), ServiceGroup):
-            if len(group.value) == 0:
+                members.append('placeholder')
+            elif issubclass(type(group), ServiceGroup):
                 if 'placeholder-service' not in available_members:
                     p = ServiceObject(name='placeholder-service', protocol='tcp', destination_port=0, description='placeholder object for empty groups')
                     create_palo_object(args, logger, p, 'ServiceObject', tree, device, devtype, failures)
-                group.value.append('placeholder-service')
-        elif issubclass(type(group), ApplicationGroup):
-            if len(group.value) == 0:
-                group.value.append('ping')
+                members.append('placeholder-service')
+            elif issubclass(type(group), ApplicationGroup):
+                members.append('ping')
+
+        setattr(group, variable, members)
+
+        # only apply() leaves the copy in the tree matching the device, create() merges the members and test mode writes nothing
+        if args.test or not removed:
+            discard_palo_object(group, live_objects)
 
-        # use of apply() here pushes the altered group to the firewall, overwriting the existing group
+        if args.verbose:
+            logger.info("{} \'{}\': group \'{}\' adding \'{}\', removing \'{}\'".format(devtype, device, name, ', '.join(added), ', '.join(removed)))
+
+        # Use of 'create()' here simply merges the added members, use of apply() pushes the altered group to the firewall, overwriting the existing group
         if not args.test:
-            group.apply()
+            if removed:
+                group.apply()
+            else:
+                group.create()
             if not args.quiet:
-                logger.info("{} \'{}\': Successfully removed \'{}\' from group \'{}\'. OK!".format(devtype, device, member, o.name))
+                logger.info("{} \'{}\': Successfully added \'{}\' and removed \'{}\' members of group \'{}\'. OK!".format(devtype, device, len(added), len(removed), name))
         else:
             if not args.quiet:
-                logger.info("{} \'{}\': TEST MODE - not removed \'{}\' from group \'{}\'. TEST!".format(devtype, device, member, o.name))
+                logger.info("{} \'{}\': TEST MODE - not added \'{}\' and removed \'{}\' members of group \'{}\'. TEST!".format(devtype, device, len(added), len(removed), name))
 
     except Exception as e:
+        discard_palo_object(group, live_objects)
         logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
-        failures.add(o.name)
-        logger.warning("{} \'{}\': Cannot remove \'{}\' from group \'{}\'. FAILED!".format(devtype, device, member, o.name))
+        failures.add(name)
+        logger.warning("{} \'{}\': Cannot modify group {} \'{}\'. FAILED!".format(devtype, device, str(type(group).__name__), name))
+
+def refresh_palo_object(object, live_objects):
+
+    # refreshes pandevice 'object' from the live device unless 'live_objects' holds it as collected recently enough (see '--object-max-age')
+
+    if live_objects is not None and live_objects.fresh(object):
+        return
+
+    read_at = time.time()
+    object.refresh()
+
+    if live_objects is not None:
+        live_objects.add([object], read_at)
+
+def discard_palo_object(object, live_objects):
+
+    # drops pandevice 'object' from 'live_objects' once the copy in the tree may differ from the live device, so the next write refreshes it
+
+    if live_objects is not None:
+        live_objects.discard(object)
 
 ####################################################################################
 #
@@ -995,12 +1410,17 @@ def remove_palo_member(args, logger, o, group, member, available_members, tree,
 #
 ####################################################################################
 
-def delete_palo_object(args, logger, o, object_names, devtype, subclass, tree, device, failures):
+def delete_palo_object(args, logger, o, object_names, devtype, subclass, tree, device, failures, live_objects=None):
 
     # takes a DeleteObject object 'o', finds it in the Tree per its Namespace (objtype) and deletes it
     # issue here is that you need the correct pandevice object in the tree in order to delete it.
     # second issue is that the object might not be in the tree so try to refresh it from live device
 
+    if args.reconcile and o.name not in object_names:
+        if args.verbose:
+            logger.info("{} \'{}\': {} \'{}\' does not exist. Nothing to delete. Skipping...".format(devtype, device, subclass.__name__, o.name))
+        return
+
     object = tree.find(o.name, subclass)
     if not issubclass(type(object), subclass):
         # 'NoneType' returned from find method if object not in Tree - try to refresh it from live device
@@ -1008,7 +1428,8 @@ def delete_palo_object(args, logger, o, object_names, devtype, subclass, tree, d
         tree.add(object)
 
     try:
-        object.refresh()
+        refresh_palo_object(object, live_objects)
+        discard_palo_object(object, live_objects)
 
         # if object is a group then empty it first by setting members to empty list. Use of 'create()' here simply changes the one variable.
         if issubclass(type(object), AddressGroup):
@@ -1037,9 +1458,10 @@ def delete_palo_object(args, logger, o, object_names, devtype, subclass, tree, d
         failures.add(o.name)
         logger.warning("{} \'{}\': Cannot delete {} \'{}\'. FAILED!".format(devtype, device, str(type(object).__name__), o.name))
 
-def delete_palo_dip(args, logger, o, existing_dip_names, devtype, tree, device, failures):
+def delete_palo_dip(args, logger, o, existing_dip_names, devtype, tree, device, failures, batch=None):
 
     # takes DIP object 'o' and unregisters ip/tag
+    # if a CreateBatch 'batch' is supplied (and enabled) the unregister is queued instead and sent later by 'update_palo_dips'
 
     if args.test:
         if not args.quiet:
@@ -1047,9 +1469,12 @@ def delete_palo_dip(args, logger, o, existing_dip_names, devtype, tree, device,
     else:
         if not args.quiet:
             logger.info("{} \'{}\': deleting DIP \'{}\'...".format(devtype, device, o.name))
+        if batch is not None and batch.dip_size > 0:
+            batch.add_dip('unregister', o)
+            return
         try:
             tree.userid.unregister(ip=o.ip, tags=o.tag)
-
+            set_palo_dip_index(existing_dip_names, 'unregister', o)
         except Exception as e:
             logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
             failures.add(o.name)
@@ -1060,7 +1485,7 @@ def delete_palo_dip(args, logger, o, existing_dip_names, devtype, tree, device,
 #
 ####################################################################################
 
-def rename_palo_object(args, logger, o, object_names, devtype, subclass, tree, device, failures):
+def rename_palo_object(args, logger, o, object_names, devtype, subclass, tree, device, failures, live_objects=None):
 
     # takes an RenameObject object 'o' and finds the object in the tree before removing the 'name' and 'type' keys
     # if object found then renames and updates
@@ -1074,7 +1499,7 @@ def rename_palo_object(args, logger, o, object_names, devtype, subclass, tree, d
         tree.add(object)
 
     try:
-        object.refresh()
+        refresh_palo_object(object, live_objects)
 
         if o.newname not in object_names:
             if not args.test:
@@ -1087,21 +1512,22 @@ def rename_palo_object(args, logger, o, object_names, devtype, subclass, tree, d
         else:
             logger.warning("{} \'{}\': Not attempting to rename {} \'{}\' to \'{}\'. Newname already exists! Skipping...".format(devtype, device, o.type, name, o.newname))
     except Exception as e:
+        discard_palo_object(object, live_objects)
         logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
         failures.add(name)
         logger.warning("{} \'{}\': Cannot rename \'{}\'. FAILED!".format(devtype, device, name))
 
-def edit_palo_object(args, logger, o, object_names, devtype, subclass, tree, device, failures):
+def edit_palo_object(args, logger, o, object_names, devtype, subclass, tree, device, failures, live_objects=None, batch=None):
 
-    # takes an EditObject object 'o' and finds the object in the tree before removing the 'name' and 'type' keys
-    # If object found then adds all the key/values to edit and updates
+    # takes an EditObject object 'o' and finds the object in the tree by its 'name'
+    # If object found then sets all the key/values in 'o.fields' and sends only those variables (see 'get_palo_patch')
+    # if a CreateBatch 'batch' is supplied (and enabled) the edited leaves are queued instead and sent later by 'update_palo_patches'
     # if object not found, create an object of subclass and try to refresh it from the live device. If found then continue as above, else fail
 
     name = o.name
     t = o.type
     object = tree.find(o.name, subclass)
-    o.__dict__.pop('type', None)
-    o.__dict__.pop('name', None)
+    fields = dict(o.fields)
 
     if not issubclass(type(object), subclass):
         # 'NoneType' returned from find method if object not in Tree - try to refresh it from live device
@@ -1109,24 +1535,208 @@ def edit_palo_object(args, logger, o, object_names, devtype, subclass, tree, dev
         tree.add(object)
 
     try:
-        object.refresh()
+        refresh_palo_object(object, live_objects)
+
+        if args.reconcile and not get_palo_changes(object, fields):
+            # compared with the refreshed object, only write if a value actually changes (see '--reconcile')
+            if args.verbose:
+                logger.info("{} \'{}\': {} \'{}\' already up to date. Skipping...".format(devtype, device, t, name))
+            return
 
-        for key, value in o.__dict__.items():
+        for key, value in fields.items():
             setattr(object, key, value)
 
-        # Use of 'create()' here simply changes the variable set in setattr.
         if not args.test:
-            object.create()
-            if not args.quiet:
+            queued = False
+            patch = get_palo_patch(object, fields)
+            if patch is None:
+                # Use of 'create()' here simply changes the variable set in setattr.
+                # the device merges list variables so the copy in the tree may no longer match it
+                discard_palo_object(object, live_objects)
+                object.create()
+            else:
+                entry, updates = patch
+                if batch is not None and batch.size > 0 and len(entry):
+                    # success is only logged once 'update_palo_patches' has sent the queued leaves
+                    batch.add_patch(object, entry, [key for key in fields if key not in updates])
+                    queued = True
+                else:
+                    updates = list(fields)
+                # use of 'update()' here replaces just the one variable on the live object
+                for key in updates:
+                    object.update(key)
+            if not args.quiet and not queued:
                 logger.info("{} \'{}\': Successfully edited {} \'{}\'. OK!".format(devtype, device, t, name))
         else:
+            # nothing was written so the copy in the tree no longer matches the device
+            discard_palo_object(object, live_objects)
             if not args.quiet:
                 logger.info("{} \'{}\': TEST MODE - not editing {} \'{}\'. TEST!".format(devtype, device, t, name))
     except Exception as e:
+        discard_palo_object(object, live_objects)
         logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
         failures.add(name)
         logger.warning("{} \'{}\': Cannot edit {} \'{}\'. FAILED!".format(devtype, device, t, name))
 
+def get_palo_patch(object, variables):
+
+    # takes pandevice object and the names of the variables being edited, returns ('<entry>' element, list of variable names) or None
+    # the '<entry>' holds only the edited single tag leaves (e.g. 'log-setting') so a 'set' merges them into the live object without resending the rest
+    # member/entry list variables are returned to be sent with 'update()' since a 'set' would add to the live list rather than replace it
+    # None means a variable cannot be sent on its own (nested, element, attribute or unknown variables) and the whole object must be sent with 'create()'
+
+    entry = ET.Element('entry', {'name': object.uid})
+    updates = list()
+    paths = set()
+
+    for variable in variables:
+        try:
+            path, value, var_path = object._get_param_specific_info(variable)
+        except Exception:
+            return None
+        if value is None or any(c in path for c in '/|{[') or var_path.vartype in ('exist', 'stub', 'none', 'attrib'):
+            return None
+        # a selector variable names the leaf itself (e.g. AddressObject 'type' -> '<fqdn>'), changing it leaves the old leaf on the device
+        # and two variables on the same leaf (e.g. AddressObject 'type' and 'value') would send it twice
+        if var_path.path == '{%s}' % variable or path in paths:
+            return None
+        paths.add(path)
+        if var_path.vartype in ('member', 'entry'):
+            updates.append(variable)
+        else:
+            var_path._set_inner_xml_tag_text(ET.SubElement(entry, path), value)
+
+    return entry, updates
+
+def update_palo_patches(args, logger, batch, devtype, device, failures, live_objects=None):
+
+    # takes a CreateBatch object and sends the queued partial edits with a single 'set' API call per chunk of 'batch.size' objects sharing an xpath
+    # objects edited with the same leaves end up in the same chunk, e.g. one log-setting change across thousands of rules is a handful of calls
+    # if a chunk fails fall back to 'update()' per variable so that 'failures' names the exact object that broke
+    # objects that could not be edited are dropped from 'live_objects' since the copy in the tree no longer matches the device
+
+    for xpath, patches in batch.patches.items():
+        xpath_tokens = xpath.split('/')
+        new_root = xpath_tokens.pop()
+        parent_xpath = '/'.join(xpath_tokens)
+
+        for n in range(0, len(patches), batch.size):
+            chunk = patches[n:n + batch.size]
+            shared_root = ET.Element(new_root)
+            for o, entry, variables in chunk:
+                shared_root.append(entry)
+
+            if args.verbose:
+                logger.info("{} \'{}\': batch editing \'{}\' {} objects...".format(devtype, device, len(chunk), str(type(chunk[0][0]).__name__)))
+
+            try:
+                pan_device = chunk[0][0].nearest_pandevice()
+                pan_device.set_config_changed()
+                pan_device.xapi.set(parent_xpath, ET.tostring(shared_root, encoding='utf-8'), retry_on_peer=chunk[0][0].HA_SYNC)
+                edited = [o for o, entry, variables in chunk]
+            except Exception as e:
+                logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+                logger.warning("{} \'{}\': Batch edit of \'{}\' {} objects failed. Retrying one at a time...".format(devtype, device, len(chunk), str(type(chunk[0][0]).__name__)))
+                edited = list()
+                for o, entry, variables in chunk:
+                    try:
+                        for variable in variables:
+                            o.update(variable)
+                        edited.append(o)
+                    except Exception as e:
+                        discard_palo_object(o, live_objects)
+                        logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+                        failures.add(o.name)
+                        logger.warning("{} \'{}\': Cannot edit {} \'{}\'. FAILED!".format(devtype, device, str(type(o).__name__), o.name))
+
+            if not args.quiet:
+                for o in edited:
+                    logger.info("{} \'{}\': Successfully edited {} \'{}\'. OK!".format(devtype, device, str(type(o).__name__), o.name))
+
+    batch.patches.clear()
+
+def reconcile_palo_object(args, logger, o, devtype, tree, device, failures, references=None):
+
+    # takes a pandevice object 'o' from the CSV and compares it with the live object of the same name already collected into 'tree'
+    # returns False if there is no live object (caller then creates it as normal), otherwise True once the live object has been dealt with
+    # only variables set in the CSV are compared so live values the CSV does not carry are left alone
+    # 'references' is a dictionary of variable -> NameScope, a changed variable naming anything missing from its scope leaves the live object alone
+
+    live = tree.find(o.name, type(o))
+
+    if live is None:
+        return False
+
+    subclass = type(o).__name__
+    values = {key: value for key, value in o.about().items() if key != 'name' and value is not None}
+    changes = get_palo_changes(live, values)
+
+    if not changes:
+        if args.verbose:
+            logger.info("{} \'{}\': {} \'{}\' unchanged. Skipping...".format(devtype, device, subclass, o.name))
+        return True
+
+    for key, value in changes.items():
+        if references and key in references:
+            for name in pandevice.string_or_list_or_none(value):
+                if name not in references[key]:
+                    logger.warning("{} \'{}\': Not attempting to update {} \'{}\'. Missing {} \'{}\'! Skipping...".format(devtype, device, subclass, o.name, key, name))
+                    return True
+
+    for key, value in changes.items():
+        setattr(live, key, value)
+
+    if args.test:
+        if not args.quiet:
+            logger.info("{} \'{}\': TEST MODE - not updating {} \'{}\' ({}). TEST!".format(devtype, device, subclass, o.name, ', '.join(sorted(changes))))
+    else:
+        if not args.quiet:
+            logger.info("{} \'{}\': updating {} \'{}\' ({})...".format(devtype, device, subclass, o.name, ', '.join(sorted(changes))))
+        try:
+            if get_palo_patch(live, changes) is None:
+                # the whole object has to be sent, 'apply()' replaces it so shorter lists in the CSV than on the device still converge
+                live.apply()
+            else:
+                # use of 'update()' replaces just the changed variable, a 'set' would merge lists with the live ones and never converge
+                for key in changes:
+                    live.update(key)
+        except Exception as e:
+            logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+            failures.add(o.name)
+
+    return True
+
+def get_palo_changes(object, values):
+
+    # takes a pandevice object and dictionary of variable -> value, returns dictionary of the values that differ from the object
+
+    changes = dict()
+
+    for key, value in values.items():
+        if normalise_palo_value(getattr(object, key, None)) != normalise_palo_value(value):
+            changes[key] = value
+
+    return changes
+
+def get_palo_member_index(tree):
+
+    # takes pandevice object and returns dictionary of group class -> member name -> set of names of the groups in 'tree' holding that member
+    # built once from the groups collected from the live device so deletions only touch the groups that reference the object
+
+    index = {AddressGroup: defaultdict(set), ServiceGroup: defaultdict(set), ApplicationGroup: defaultdict(set)}
+
+    for child in tree.children:
+        if issubclass(type(child), AddressGroup):
+            members = child.static_value
+        elif issubclass(type(child), (ServiceGroup, ApplicationGroup)):
+            members = child.value
+        else:
+            continue
+        for member in pandevice.string_or_list(members or list()):
+            index[type(child)][member].add(child.name)
+
+    return index
+
 ####################################################################################
 #
 # DBedit functions
@@ -1243,17 +1853,17 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
     default_icmp_type = 98
     default_icmp_code = 99
 
-    nested_dict = lambda: defaultdict(nested_dict)
-    dbedit_processed_objects = nested_dict()
-
-    nested_dict_pre = lambda: defaultdict(nested_dict)
-    dbedit_processed_pre_rules = nested_dict_pre()
-
-    nested_dict_post = lambda: defaultdict(nested_dict)
-    dbedit_processed_post_rules = nested_dict_post()
+    dbedit_processed_objects = DbeditIndex()
+    dbedit_processed_pre_rules = DbeditIndex()
+    dbedit_processed_post_rules = DbeditIndex()
 
     t = today.strftime('%Y-%m-%d')
-    auto_description = ('CREATED by API: ' + t)
+
+    # with '--location' only rows for that location and 'global' are built, routes are keyed by router name so are always kept
+    in_scope = None
+    if args.location and args.location != 'ALL':
+        in_scope = {args.location, 'global'}
+    out_of_scope = 0
 
     # Opening a file with the mode 'U' or 'rU' will open a file for reading in universal newline mode
     try:
@@ -1270,12 +1880,19 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
 
             for row in reader:
 
+                # rows are handled one at a time so drop anything out of scope before any conversion or object creation
+                if in_scope is not None and row[location].split('__')[0] not in in_scope and row[type] != 'route':
+                    out_of_scope += 1
+                    continue
+
                 ###############################################################################
                 #
                 # We need to create proper var types from CSV else pandevice will barf - also update comment/desc field
                 #
                 ###############################################################################
 
+                auto_description = ('CREATED by API: ' + t)
+
                 if row[op_action] == 'edit':
                     auto_description = ('EDITED by API: ' + t)
 
@@ -1325,16 +1942,6 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
                     if args.verbose:
                         logger.info('dbedit: Found vendor \'{}\', location \'{}\', action \'{}\', type \'{}\' processing...'.format(row[vendor], row[location], row[op_action], row[type]))
 
-                    # ensure that the object at 'row[type]' is a list otherwise you will get an error about append
-                    if not dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]]:
-                        dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]] = list()
-
-                    if not dbedit_processed_pre_rules[row[vendor]][row[location]][row[op_action]][row[type]]:
-                        dbedit_processed_pre_rules[row[vendor]][row[location]][row[op_action]][row[type]] = list()
-
-                    if not dbedit_processed_post_rules[row[vendor]][row[location]][row[op_action]][row[type]]:
-                        dbedit_processed_post_rules[row[vendor]][row[location]][row[op_action]][row[type]] = list()
-
                     # check type and create object of 'type' provided
                     if row[op_action] == 'delete':
                         if row[type] == 'dip':
@@ -1344,6 +1951,15 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
                                 logger.warning('dbedit: junk syntax for Dip \'{}#{}#{}\', skipping...'.format(row[op_action], row[ip], row[tag]))
                         else:
                             o = DeleteObject(name=row[name], type=row[type])
+                    elif row[op_action] == 'sync':
+                        # rows give the desired registered-ips for the location, only 'dip' can be synced
+                        if row[type] == 'dip':
+                            if check_dbedit_syntax_palo_dip(row[op_action], row[members], row[tag], args):
+                                o = Dip(ip=row[members], tag=row[tag])
+                            else:
+                                logger.warning('dbedit: junk syntax for Dip \'{}#{}#{}\', skipping...'.format(row[op_action], row[ip], row[tag]))
+                        else:
+                            logger.warning('dbedit: Unsupported type \'{}\' for action \'sync\', skipping...'.format(row[type]))
                     elif row[op_action] == 'rename':
                         if row[value]:
                             o = RenameObject(name=row[name], type=row[type], newname=row[value])
@@ -1457,12 +2073,10 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
                             if row[rule_action]:
                                 fields_to_edit['action'] = row[rule_action]
                                 row[rule_action] = ""
-                        fields_to_edit['name'] = row[name]
-                        fields_to_edit['type'] = row[type]
                         for n in range(5, csv_fields):
                             if row[n]:
                                 fields_to_edit[fields[n]] = row[n]
-                        o = EditObject(**fields_to_edit)
+                        o = EditObject(name=row[name], type=row[type], fields=fields_to_edit)
                     elif row[op_action] == 'addtogroup':
                         o = ModifyGroup(name=row[name], type=row[type], members=row[members], action=row[op_action], description=row[description])
                     elif row[op_action] == 'removefromgroup':
@@ -1886,30 +2500,30 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
 
                     # append object 'o' to list
                     if o is not None:
-                        if args.verbose == 3: 
-                            print(dir(o))
-                            print(vars(o))
+                        if args.verbose == 3:
+                            # dbedit records are slotted (see Record) so have no vars() to show
+                            logger.debug('dbedit: {}'.format(repr(o) if isinstance(o, Record) else vars(o)))
                         # you will have to return a different set of objects here for pre/post-rules as no way to differentiate later
                         if row[op_action] == 'delete':
-                            dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_objects.add(row[vendor], row[location], row[op_action], o)
                         elif row[op_action] == 'rename':
-                            dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_objects.add(row[vendor], row[location], row[op_action], o)
                         elif row[op_action] == 'edit':
-                            dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_objects.add(row[vendor], row[location], row[op_action], o)
                         elif row[op_action] == 'addtogroup':
-                            dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_objects.add(row[vendor], row[location], row[op_action], o)
                         elif row[op_action] == 'removefromgroup':
-                            dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_objects.add(row[vendor], row[location], row[op_action], o)
                         elif row[type] == 'pre-security-rule' or row[type] == 'security-rule':
-                            dbedit_processed_pre_rules[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_pre_rules.add(row[vendor], row[location], row[op_action], o)
                         elif row[type] == 'pre-nat-rule' or row[type] == 'nat-rule':
-                            dbedit_processed_pre_rules[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_pre_rules.add(row[vendor], row[location], row[op_action], o)
                         if row[type] == 'post-security-rule':
-                            dbedit_processed_post_rules[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_post_rules.add(row[vendor], row[location], row[op_action], o)
                         elif row[type] == 'post-nat-rule':
-                            dbedit_processed_post_rules[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_post_rules.add(row[vendor], row[location], row[op_action], o)
                         else:
-                            dbedit_processed_objects[row[vendor]][row[location]][row[op_action]][row[type]].append(o)
+                            dbedit_processed_objects.add(row[vendor], row[location], row[op_action], o)
         f.close()
 
     except Exception as e:
@@ -1918,6 +2532,9 @@ def read_dbedit_csv(args, logger, filename, emails, email_subject, email_message
             send_email(email_subject, email + __email_domain__, logfile, email_message, args, logger)
         sys.exit(1)
 
+    if out_of_scope and args.verbose:
+        logger.info('dbedit: Skipped \'{}\' rows outside location \'{}\''.format(out_of_scope, args.location))
+
     # return our list of dbedit object that passed syntax checking
     return dbedit_processed_objects, dbedit_processed_pre_rules, dbedit_processed_post_rules
 
@@ -2302,24 +2919,10 @@ def check_dbedit_syntax_palo_security_rule(name, action, type, description, args
 
 def get_dbedit_list(dbedit_objects, vendor, location, op_action, subclass, logger):
 
-    # will return a list of objects per the arguments from the dbedit parsed dictionary
-
-    action_items = list()
+    # will return a list of objects per the arguments from the dbedit parsed index
+    # need to preserve order here as rules require it! - the index keeps CSV order and holds each object once
 
-    for v in dbedit_objects.keys():
-        if v == vendor:
-            for l in dbedit_objects[v].keys():
-                if l == location:
-                    for a in dbedit_objects[v][l].keys():
-                        if a == op_action:
-                            for o in dbedit_objects[v][l][a].keys():
-                                # at this point we have a list of objects for the supplied vendor, location and action
-                                for i in dbedit_objects[v][l][a][o]:
-                                    if issubclass(type(i), subclass):
-                                        action_items.append(i)
-
-    # need to preserve order here as rules require it!
-    return list(unique_everseen(action_items))
+    return dbedit_objects.get(vendor, location, op_action, subclass)
 
 def get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules, vendor, location, op_action, devtype, args, logger):
 
@@ -2365,6 +2968,10 @@ def get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_r
         dips = get_dbedit_list(dbedit_objects, vendor, location, op_action, Dip, logger)
         deletions = get_dbedit_list(dbedit_objects, vendor, location, op_action, DeleteObject, logger)
 
+    elif op_action == 'sync':
+        if devtype != 'VRF':
+            dips = get_dbedit_list(dbedit_objects, vendor, location, op_action, Dip, logger)
+
     elif op_action == 'rename':
         if devtype != 'VRF':
             renames = get_dbedit_list(dbedit_objects, vendor, location, op_action, RenameObject, logger)
@@ -2423,6 +3030,10 @@ def get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_r
             if devtype != 'VRF':
                 logger.info('{} \'{}\': dbedit {} requests \'{}\' EditObject objects'.format(devtype, location, op_action, len(dbedit_edits)))
 
+        elif op_action == 'sync':
+            if devtype != 'VRF':
+                logger.info('{} \'{}\': dbedit {} requests \'{}\' Dip objects'.format(devtype, location, op_action, len(dbedit_dips)))
+
         elif op_action == 'rename':
             if devtype != 'VRF':
                 logger.info('{} \'{}\': dbedit {} requests \'{}\' RenameObject objects'.format(devtype, location, op_action, len(dbedit_renames)))
@@ -2433,6 +3044,149 @@ def get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_r
 
     return addresses, address_groups, services, service_groups, tags, applications, application_groups, pre_rules, post_rules, pre_nats, post_nats, deletions, renames, edits, modifications, static_routes, dips, dbedit_addresses, dbedit_address_groups, dbedit_services, dbedit_service_groups, dbedit_tags, dbedit_applications, dbedit_application_groups, dbedit_application_filter_names, dbedit_pre_rules, dbedit_pre_nats, dbedit_post_rules, dbedit_post_nats, dbedit_deletions, dbedit_renames, dbedit_edits, dbedit_modifications, dbedit_static_routes, dbedit_dips
 
+def get_patch_args(args, logger):
+
+    # takes the '--patch TYPE VARIABLE=VALUE ...' and '--where SELECTOR' arguments and returns (type, dictionary of variable -> value, list of (variable, operator, value) selectors)
+    # returns None, having logged why, if they cannot be parsed
+
+    patch_types = OrderedDict([('address', AddressObject), ('address-group', AddressGroup), ('service', ServiceObject), ('service-group', ServiceGroup), ('tag', Tag),
+                               ('application', ApplicationObject), ('application-group', ApplicationGroup), ('application-filter', ApplicationFilter),
+                               ('security-rule', SecurityRule), ('nat-rule', NatRule), ('pre-security-rule', SecurityRule), ('pre-nat-rule', NatRule),
+                               ('post-security-rule', SecurityRule), ('post-nat-rule', NatRule)])
+
+    objtype = args.patch[0]
+    if objtype not in patch_types:
+        logger.error('Argument \'--patch\': Unsupported type \'{}\', use one of \'{}\'.'.format(objtype, ', '.join(patch_types)))
+        return None
+
+    # variables are checked against the pandevice params of the type, a typo would otherwise select or patch nothing without complaint
+    variables = set(patch_types[objtype]().about())
+
+    fields = OrderedDict()
+    for assignment in args.patch[1:]:
+        variable, sep, value = assignment.partition('=')
+        if not sep or not variable:
+            logger.error('Argument \'--patch\': \'{}\' is not VARIABLE=VALUE.'.format(assignment))
+            return None
+        if variable == 'name' or variable not in variables:
+            logger.error('Argument \'--patch\': \'{}\' is not a variable of {} objects.'.format(variable, objtype))
+            return None
+        fields[variable] = value
+
+    if not fields:
+        logger.error('Argument \'--patch\': No VARIABLE=VALUE given for \'{}\'.'.format(objtype))
+        return None
+
+    # never patch everything by accident, '--where name~.' selects every object
+    if not args.where:
+        logger.error('Argument \'--patch\' needs at least one \'--where\' selector.')
+        return None
+
+    selectors = list()
+    for selector in args.where:
+        match = re.match(r'^(\w+)(=|~)(.*)$', selector)
+        if not match:
+            logger.error('Argument \'--where\': \'{}\' is not VARIABLE=VALUE or VARIABLE~REGEX.'.format(selector))
+            return None
+        variable, operator, value = match.groups()
+        if variable not in variables:
+            logger.error('Argument \'--where\': \'{}\' is not a variable of {} objects.'.format(variable, objtype))
+            return None
+        if operator == '~':
+            try:
+                value = re.compile(value)
+            except re.error as e:
+                logger.error('Argument \'--where\': \'{}\' is not a valid regex, ({}).'.format(selector, e))
+                return None
+        selectors.append((variable, operator, value))
+
+    return objtype, fields, selectors
+
+def get_palo_patch_edits(patch, objects, rules, location, args, logger):
+
+    # takes the parsed '--patch' (see 'get_patch_args'), list of objects and dictionary of rule type -> list of rules collected from 'location'
+    # the selectors are evaluated against the collected objects, no further API calls are made
+    # returns list of EditObjects for the objects of the patch type matching every selector and not already holding the patched values
+
+    objtype, fields, selectors = patch
+
+    subclasses = {'address': AddressObject, 'address-group': AddressGroup, 'service': ServiceObject, 'service-group': ServiceGroup, 'tag': Tag,
+                  'application': ApplicationObject, 'application-group': ApplicationGroup, 'application-filter': ApplicationFilter}
+
+    if objtype in rules:
+        candidates = rules[objtype]
+    elif objtype in subclasses:
+        candidates = [o for o in objects if type(o) is subclasses[objtype]]
+    else:
+        logger.warning('Patch: \'{}\': No {} objects are collected here. Skipping...'.format(location, objtype))
+        return list()
+
+    edits = list()
+    matches = 0
+
+    for o in candidates:
+        if not match_palo_object(o, selectors):
+            continue
+        matches += 1
+        values = OrderedDict((variable, get_palo_patch_value(o, variable, value)) for variable, value in fields.items())
+        if get_palo_changes(o, values):
+            edits.append(EditObject(name=o.name, type=objtype, fields=values))
+
+    if not args.quiet:
+        logger.info('Patch: \'{}\': \'{}\' of \'{}\' {} objects match, \'{}\' need changing'.format(location, matches, len(candidates), objtype, len(edits)))
+
+    return edits
+
+def match_palo_object(object, selectors):
+
+    # takes pandevice object and list of (variable, operator, value) selectors, returns True if the object matches every selector
+    # '=' matches the value or any member of a list, '~' searches the value or any member of a list with the regex, yes/no variables are compared as 'yes'/'no'
+    # unset variables match 'no' if yes/no, otherwise '' (e.g. '--where log_setting=' selects rules without a log profile), variables the object does not have never match
+
+    for variable, operator, value in selectors:
+        if variable not in object.about():
+            return False
+        actual = getattr(object, variable, None)
+        if actual is None:
+            # unset variables are left out of the config, e.g. no '<disabled>' is an enabled rule and no '<log-setting>' is ''
+            try:
+                vartype = object._get_param_specific_info(variable)[2].vartype
+            except Exception:
+                vartype = None
+            actual = 'no' if vartype in ('yesno', 'bool', 'exist') else ''
+        if isinstance(actual, bool):
+            actual = 'yes' if actual else 'no'
+        actual = [str(v) for v in pandevice.string_or_list_or_none(actual)]
+        if operator == '=':
+            if value not in actual:
+                return False
+        elif not any(value.search(v) for v in actual):
+            return False
+
+    return True
+
+def get_palo_patch_value(object, variable, value):
+
+    # takes pandevice object, variable name and '--patch' string value and returns the value in the form pandevice holds it
+    # yes/no variables become bool, comma separated values for list variables become lists, anything else is left as a string
+
+    try:
+        path, current, var_path = object._get_param_specific_info(variable)
+    except Exception:
+        return value
+
+    if var_path.vartype in ('yesno', 'bool', 'exist'):
+        return value.lower() in ('yes', 'true')
+    if var_path.vartype in ('member', 'entry'):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    if var_path.vartype == 'int':
+        try:
+            return int(value)
+        except ValueError:
+            return value
+
+    return value
+
 ####################################################################################
 #
 # Print/Write functions
@@ -2579,13 +3333,14 @@ def print_palo_objects_list(name, objects, logger):
     else:
         logger.info('\'{}\' list is empty so nothing to print!'.format(name))
 
-def write_objects_dbedit_csv(filename, name, objects, ruletype, objsource, filemode, args, logger):
+def write_objects_dbedit_csv(filename, sections, objsource, filemode, args, logger):
 
-    # takes filename and list of pandevice objects and after determining type, writes the contents to file per CSV format
+    # takes filename and a list of (name, pandevice objects, ruletype) sections and writes the contents to file per CSV format
     # or write as json? but then cannot tidy up in excel if you did it that way! - json.dump(data, outfile)
     # replace newline characters with spaces in string fields, else UNIX will barf later via 'neutralise_newlines' function
+    # the file is opened once for all sections and each row is filled from a per-class column table rather than testing every field
 
-    if objects:
+    if any(objects for section_name, objects, ruletype in sections):
         file_action = filemode.lower()[:1]
         csv_fields = 100
 
@@ -2691,25 +3446,268 @@ def write_objects_dbedit_csv(filename, name, objects, ruletype, objsource, filem
         default_icmp_type = 98
         default_icmp_code = 99
 
+        # booleans are written as 'TRUE'/'FALSE' so they survive a round trip through Excel
+        def flag(v):
+            return 'TRUE' if v is True else 'FALSE'
+
+        def rule_description(p):
+            p.description = neutralise_newlines(p.description, args, logger)
+            return p.description
+
+        ###############################################################################
+        #
+        # column tables - (field, getter) pairs per object type, vendor/objtype/op_action/location are filled in for every row
+        #
+        ###############################################################################
+
+        static_address_group_columns = ('address-group', [
+            (subtype, lambda p: 'static'),
+            (members, lambda p: p.static_value),
+            (description, lambda p: p.description)])
+
+        dynamic_address_group_columns = ('address-group', [
+            (subtype, lambda p: 'dynamic'),
+            (description, lambda p: p.description),
+            (tag, lambda p: p.tag),
+            (value, lambda p: p.dynamic_value)])
+
+        # ip-range and fqdn subtypes use 'value' field instead
+        netmask_address_columns = ('address', [
+            (subtype, lambda p: p.type),
+            (description, lambda p: p.description),
+            (tag, lambda p: p.tag),
+            (cidr, lambda p: p.value)])
+
+        other_address_columns = ('address', [
+            (subtype, lambda p: p.type),
+            (description, lambda p: p.description),
+            (tag, lambda p: p.tag),
+            (value, lambda p: p.value)])
+
+        application_container_columns = ('application-container', [
+            (members, lambda p: p.applications)])
+
+        application_filter_columns = ('application-filter', [
+            (tag, lambda p: p.tag),
+            (category, lambda p: p.category),
+            (subcategory, lambda p: p.subcategory),
+            (technology, lambda p: p.technology),
+            (risk, lambda p: p.risk),
+            (evasive, lambda p: flag(p.evasive)),
+            (excessive_bandwidth_use, lambda p: flag(p.excessive_bandwidth_use)),
+            (prone_to_misuse, lambda p: flag(p.prone_to_misuse)),
+            (is_saas, lambda p: flag(p.is_saas)),
+            (transfers_files, lambda p: flag(p.transfers_files)),
+            (tunnels_other_apps, lambda p: flag(p.tunnels_other_apps)),
+            (used_by_malware, lambda p: flag(p.used_by_malware)),
+            (has_known_vulnerabilities, lambda p: flag(p.has_known_vulnerabilities)),
+            (pervasive, lambda p: flag(p.pervasive))])
+
+        application_group_columns = ('application-group', [
+            (tag, lambda p: p.tag),
+            (members, lambda p: p.value)])
+
+        application_columns = ('application', [
+            (description, lambda p: p.description),
+            (tag, lambda p: p.tag),
+            (category, lambda p: p.category),
+            (subcategory, lambda p: p.subcategory),
+            (technology, lambda p: p.technology),
+            (risk, lambda p: p.risk),
+            (default_type, lambda p: p.default_type),
+            (default_port, lambda p: p.default_port),
+            (default_ip_protocol, lambda p: p.default_ip_protocol),
+            (default_icmp_type, lambda p: p.default_icmp_type),
+            (default_icmp_code, lambda p: p.default_icmp_code),
+            (parent_app, lambda p: p.parent_app),
+            (timeout, lambda p: p.timeout),
+            (tcp_timeout, lambda p: p.tcp_timeout),
+            (udp_timeout, lambda p: p.udp_timeout),
+            (tcp_half_closed_timeout, lambda p: p.tcp_half_closed_timeout),
+            (tcp_time_wait_timeout, lambda p: p.tcp_time_wait_timeout),
+            (evasive, lambda p: flag(p.evasive_behavior)),
+            (excessive_bandwidth_use, lambda p: flag(p.consume_big_bandwidth)),
+            (used_by_malware, lambda p: flag(p.used_by_malware)),
+            (transfers_files, lambda p: flag(p.able_to_transfer_file)),
+            (has_known_vulnerabilities, lambda p: flag(p.has_known_vulnerability)),
+            (tunnels_other_apps, lambda p: flag(p.tunnel_other_application)),
+            (tunnel_applications, lambda p: p.tunnel_applications),
+            (prone_to_misuse, lambda p: flag(p.prone_to_misuse)),
+            (pervasive, lambda p: flag(p.pervasive_use)),
+            (file_type_ident, lambda p: flag(p.file_type_ident)),
+            (virus_ident, lambda p: flag(p.virus_ident)),
+            (data_ident, lambda p: flag(p.data_ident))])
+
+        service_group_columns = ('service-group', [
+            (tag, lambda p: p.tag),
+            (members, lambda p: p.value)])
+
+        service_columns = ('service', [
+            (description, lambda p: p.description),
+            (tag, lambda p: p.tag),
+            (protocol, lambda p: p.protocol),
+            (source_port, lambda p: p.source_port),
+            (destination_port, lambda p: p.destination_port)])
+
+        tag_columns = ('tag', [
+            (description, lambda p: p.comments),
+            (color, lambda p: p.color)])
+
+        # Dip objects have no name and always live in 'shared'
+        dip_columns = ('dip', [
+            (members, lambda p: p.ip),
+            (tag, lambda p: p.tag)])
+
+        route_columns = ('route', [
+            (cidr, lambda p: p.destination),
+            (subtype, lambda p: p.nexthop_type),
+            (nexthop, lambda p: p.nexthop),
+            (interface, lambda p: p.interface),
+            (value, lambda p: p.admin_dist),
+            (metric, lambda p: p.metric)])
+
+        # rules take their objtype from the section's 'ruletype'
+        security_rule_columns = (None, [
+            (rule_action, lambda p: p.action),
+            (application, lambda p: p.application),
+            (category, lambda p: p.category),
+            (data_filtering, lambda p: p.data_filtering),
+            (description, rule_description),
+            (destination, lambda p: p.destination),
+            (disable_server_response_inspection, lambda p: p.disable_server_response_inspection),
+            (disabled, lambda p: flag(p.disabled)),
+            (file_blocking, lambda p: p.file_blocking),
+            (fromzone, lambda p: p.fromzone),
+            (group, lambda p: p.group),
+            (hip_profiles, lambda p: p.hip_profiles),
+            (icmp_unreachable, lambda p: flag(p.icmp_unreachable)),
+            (log_end, lambda p: 'FALSE' if p.log_end is False else 'TRUE'),
+            (log_setting, lambda p: p.log_setting),
+            (log_start, lambda p: flag(p.log_start)),
+            (negate_destination, lambda p: flag(p.negate_destination)),
+            (negate_source, lambda p: flag(p.negate_source)),
+            (negate_target, lambda p: flag(p.negate_target)),
+            (schedule, lambda p: p.schedule),
+            (service, lambda p: p.service),
+            (source, lambda p: p.source),
+            (source_user, lambda p: p.source_user),
+            (spyware, lambda p: p.spyware),
+            (tag, lambda p: p.tag),
+            (target, lambda p: p.target),
+            (tozone, lambda p: p.tozone),
+            (subtype, lambda p: p.type),
+            (url_filtering, lambda p: p.url_filtering),
+            (virus, lambda p: p.virus),
+            (vulnerability, lambda p: p.vulnerability),
+            (wildfire_analysis, lambda p: p.wildfire_analysis)])
+
+        nat_rule_columns = (None, [
+            (description, rule_description),
+            (destination, lambda p: p.destination),
+            (destination_dynamic_translated_address, lambda p: p.destination_dynamic_translated_address),
+            (destination_dynamic_translated_distribution, lambda p: p.destination_dynamic_translated_distribution),
+            (destination_dynamic_translated_port, lambda p: p.destination_dynamic_translated_port),
+            (destination_translated_address, lambda p: p.destination_translated_address),
+            (destination_translated_port, lambda p: p.destination_translated_port),
+            (disabled, lambda p: flag(p.disabled)),
+            (fromzone, lambda p: p.fromzone),
+            (ha_binding, lambda p: p.ha_binding),
+            (nat_type, lambda p: p.nat_type),
+            (negate_target, lambda p: flag(p.negate_target)),
+            (service, lambda p: p.service),
+            (source, lambda p: p.source),
+            (source_translation_address_type, lambda p: p.source_translation_address_type),
+            (source_translation_fallback_interface, lambda p: p.source_translation_fallback_interface),
+            (source_translation_fallback_ip_address, lambda p: p.source_translation_fallback_ip_address),
+            (source_translation_fallback_ip_type, lambda p: p.source_translation_fallback_ip_type),
+            (source_translation_fallback_translated_addresses, lambda p: p.source_translation_fallback_translated_addresses),
+            (source_translation_fallback_type, lambda p: p.source_translation_fallback_type),
+            (source_translation_interface, lambda p: p.source_translation_interface),
+            (source_translation_ip_address, lambda p: p.source_translation_ip_address),
+            (source_translation_static_bi_directional, lambda p: flag(p.source_translation_static_bi_directional)),
+            (source_translation_static_translated_address, lambda p: p.source_translation_static_translated_address),
+            (source_translation_translated_addresses, lambda p: p.source_translation_translated_addresses),
+            (source_translation_type, lambda p: p.source_translation_type),
+            (tag, lambda p: p.tag),
+            (target, lambda p: p.target),
+            (interface, lambda p: p.to_interface),
+            (tozone, lambda p: p.tozone)])
+
+        zone_columns = ('zone', [
+            (interface, lambda p: p.interface),
+            (zone, lambda p: p.mode),
+            (mgmt_profile, lambda p: p.zone_profile),
+            (log_setting, lambda p: p.log_setting),
+            (enable_user_identification, lambda p: p.enable_user_identification),
+            (source, lambda p: p.exclude_acl),
+            (destination, lambda p: p.exclude_acl)])
+
+        # checked in order with issubclass, the first match wins
+        column_tables = [
+            (AddressGroup, lambda p: static_address_group_columns if p.static_value else dynamic_address_group_columns),
+            (AddressObject, lambda p: netmask_address_columns if p.type == 'ip-netmask' else other_address_columns),
+            (ApplicationContainer, lambda p: application_container_columns),
+            (ApplicationFilter, lambda p: application_filter_columns),
+            (ApplicationGroup, lambda p: application_group_columns),
+            (ApplicationObject, lambda p: application_columns),
+            (ServiceGroup, lambda p: service_group_columns),
+            (ServiceObject, lambda p: service_columns),
+            (Tag, lambda p: tag_columns),
+            (Dip, lambda p: dip_columns),
+            (StaticRoute, lambda p: route_columns),
+            (SecurityRule, lambda p: security_rule_columns),
+            (NatRule, lambda p: nat_rule_columns),
+            (Zone, lambda p: zone_columns)]
+
+        # remember which table each concrete class resolved to
+        class_tables = dict()
+
+        def get_rows(objects, ruletype):
+            for p in objects:
+                cls = type(p)
+                if cls not in class_tables:
+                    class_tables[cls] = None
+                    for subclass, select in column_tables:
+                        if issubclass(cls, subclass):
+                            class_tables[cls] = select
+                            break
+
+                select = class_tables[cls]
+                if select is None:
+                    # unknown types still get a row so the line count matches the object count
+                    yield ['end']
+                    continue
+
+                row_type, columns = select(p)
+                row = [''] * csv_fields
+                row[vendor] = 'palo'
+                row[objtype] = row_type if row_type else ruletype
+                row[op_action] = '__ACTION__'
+                if row_type == 'dip':
+                    row[location] = 'shared'
+                else:
+                    row[location] = objsource
+                    row[name] = p.name
+                for n, get in columns:
+                    row[n] = get(p)
+
+                # add a final entry to ensure that if anyone edits with Excel that all the empty fields are written.
+                row.append('end')
+                yield row
+
         if args.output == 'script_decides':
             fullfilename = filename+'.csv'
         else:
-            fullfilename = args.output
-
-        if args.verbose:
-            logger.info('Writing file \'{}.csv\' with {} objects'.format(filename, len(objects)))
+            fullfilename = args.output
 
-        # '+' here means 'read' as well
         try:
-            with open('../data/databases/' + fullfilename, file_action + '+', encoding='utf-8', newline='') as f:
+            with open('../data/databases/' + fullfilename, file_action, encoding='utf-8', newline='') as f:
 
                 # have to quote all the fields
                 writer = csv.writer(f, delimiter=',', doublequote=False, escapechar='"', quoting=csv.QUOTE_ALL)
 
-                # if this is the first time the file was opened then add the header
-                f.seek(0)  # ensure you're at the start of the file..
-                first_char = f.read(1)  # get the first character
-                if not first_char:
+                # if this is the first time the file was opened then add the header (append mode starts at the end of the file)
+                if not f.tell():
                     # write the header row
                     writer.writerow(
                         ['#vendor', 'objtype', 'op_action', 'location', 'name', 'subtype', 'members', 'ip', 'netmask', 'cidr', \
@@ -2734,657 +3732,15 @@ def write_objects_dbedit_csv(filename, name, objects, ruletype, objsource, filem
                          'tcp_half_closed_timeout', 'tcp_time_wait_timeout', 'tunnel_applications', \
                          'file_type_ident', 'virus_ident', 'data_ident', 'default_port', 'default_ip_protocol', \
                          'default_icmp_type', 'default_icmp_code', 'ignore_this_end_marker'])
-                else:
-                    # goto end of file
-                    f.seek(2)
-
-                for p in objects:
-
-                    row = list()
-
-                    if issubclass(type(p), AddressGroup):
-
-                        if p.static_value:
-                            for n in range(0, csv_fields):
-                                if n == vendor:
-                                    row.append('palo')
-                                elif n == objtype:
-                                    row.append('address-group')
-                                elif n == op_action:
-                                    row.append('__ACTION__')
-                                elif n == location:
-                                    row.append(objsource)
-                                elif n == name:
-                                    row.append(p.name)
-                                elif n == subtype:
-                                    row.append('static')
-                                elif n == members:
-                                    row.append(p.static_value)
-                                elif n == description:
-                                    row.append(p.description)
-                                else:
-                                    row.append('')
-                        else:
-                            for n in range(0, csv_fields):
-                                if n == vendor:
-                                    row.append('palo')
-                                elif n == objtype:
-                                    row.append('address-group')
-                                elif n == op_action:
-                                    row.append('__ACTION__')
-                                elif n == location:
-                                    row.append(objsource)
-                                elif n == name:
-                                    row.append(p.name)
-                                elif n == subtype:
-                                    row.append('dynamic')
-                                elif n == description:
-                                    row.append(p.description)
-                                elif n == tag:
-                                    row.append(p.tag)
-                                elif n == value:
-                                    row.append(p.dynamic_value)
-                                else:
-                                    row.append('')
-
-                    elif issubclass(type(p), AddressObject):
-
-                        if p.type == 'ip-netmask':
-                            for n in range(0, csv_fields):
-                                if n == vendor:
-                                    row.append('palo')
-                                elif n == objtype:
-                                    row.append('address')
-                                elif n == op_action:
-                                    row.append('__ACTION__')
-                                elif n == location:
-                                    row.append(objsource)
-                                elif n == name:
-                                    row.append(p.name)
-                                elif n == subtype:
-                                    row.append(p.type)
-                                elif n == description:
-                                    row.append(p.description)
-                                elif n == tag:
-                                    row.append(p.tag)
-                                elif n == cidr:
-                                    row.append(p.value)
-                                else:
-                                    row.append('')
-                        else:
-                            # ip-range and fqdn subtypes use 'value' field instead
-                            for n in range(0, csv_fields):
-                                if n == vendor:
-                                    row.append('palo')
-                                elif n == objtype:
-                                    row.append('address')
-                                elif n == op_action:
-                                    row.append('__ACTION__')
-                                elif n == location:
-                                    row.append(objsource)
-                                elif n == name:
-                                    row.append(p.name)
-                                elif n == subtype:
-                                    row.append(p.type)
-                                elif n == description:
-                                    row.append(p.description)
-                                elif n == tag:
-                                    row.append(p.tag)
-                                elif n == value:
-                                    row.append(p.value)
-                                else:
-                                    row.append('')
-
-                    elif issubclass(type(p), ApplicationContainer):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('application-container')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == members:
-                                row.append(p.applications)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), ApplicationFilter):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('application-filter')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == category:
-                                row.append(p.category)
-                            elif n == subcategory:
-                                row.append(p.subcategory)
-                            elif n == technology:
-                                row.append(p.technology)
-                            elif n == risk:
-                                row.append(p.risk)
-                            elif n == evasive:
-                                if p.evasive is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == excessive_bandwidth_use:
-                                if p.excessive_bandwidth_use is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == prone_to_misuse:
-                                if p.prone_to_misuse is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == is_saas:
-                                if p.is_saas is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == transfers_files:
-                                if p.transfers_files is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == tunnels_other_apps:
-                                if p.tunnels_other_apps is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == used_by_malware:
-                                if p.used_by_malware is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == has_known_vulnerabilities:
-                                if p.has_known_vulnerabilities is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == pervasive:
-                                if p.pervasive is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), ApplicationGroup):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('application-group')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == members:
-                                row.append(p.value)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), ApplicationObject):
-                        #print(p.__dict__)
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('application')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == description:
-                                row.append(p.description)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == category:
-                                row.append(p.category)
-                            elif n == subcategory:
-                                row.append(p.subcategory)
-                            elif n == technology:
-                                row.append(p.technology)
-                            elif n == risk:
-                                row.append(p.risk)
-                            elif n == default_type:
-                                row.append(p.default_type)
-                            elif n == default_port:
-                                row.append(p.default_port)
-                            elif n == default_ip_protocol:
-                                row.append(p.default_ip_protocol)
-                            elif n == default_icmp_type:
-                                row.append(p.default_icmp_type)
-                            elif n == default_icmp_code:
-                                row.append(p.default_icmp_code)
-                            elif n == parent_app:
-                                row.append(p.parent_app)
-                            elif n == timeout:
-                                row.append(p.timeout)
-                            elif n == tcp_timeout:
-                                row.append(p.tcp_timeout)
-                            elif n == udp_timeout:
-                                row.append(p.udp_timeout)
-                            elif n == tcp_half_closed_timeout:
-                                row.append(p.tcp_half_closed_timeout)
-                            elif n == tcp_time_wait_timeout:
-                                row.append(p.tcp_time_wait_timeout)
-                            elif n == evasive:
-                                if p.evasive_behavior is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == excessive_bandwidth_use:
-                                if p.consume_big_bandwidth is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == used_by_malware:
-                                if p.used_by_malware is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == transfers_files:
-                                if p.able_to_transfer_file is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == has_known_vulnerabilities:
-                                if p.has_known_vulnerability is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == tunnels_other_apps:
-                                if p.tunnel_other_application is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == tunnel_applications:
-                                row.append(p.tunnel_applications)
-                            elif n == prone_to_misuse:
-                                if p.prone_to_misuse is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == pervasive:
-                                if p.pervasive_use is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == file_type_ident:
-                                if p.file_type_ident is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == virus_ident:
-                                if p.virus_ident is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == data_ident:
-                                if p.data_ident is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), ServiceGroup):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('service-group')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == members:
-                                row.append(p.value)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), ServiceObject):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('service')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == description:
-                                row.append(p.description)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == protocol:
-                                row.append(p.protocol)
-                            elif n == source_port:
-                                row.append(p.source_port)
-                            elif n == destination_port:
-                                row.append(p.destination_port)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), Tag):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('tag')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == description:
-                                row.append(p.comments)
-                            elif n == color:
-                                row.append(p.color)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), Dip):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('dip')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append('shared')
-                            elif n == members:
-                                row.append(p.ip)
-                            elif n == tag:
-                                row.append(p.tag)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), StaticRoute):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('route')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == cidr:
-                                row.append(p.destination)
-                            elif n == subtype:
-                                row.append(p.nexthop_type)
-                            elif n == nexthop:
-                                row.append(p.nexthop)
-                            elif n == interface:
-                                row.append(p.interface)
-                            elif n == value:
-                                row.append(p.admin_dist)
-                            elif n == metric:
-                                row.append(p.metric)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), SecurityRule):
-
-                        #print (p.__dict__)
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append(ruletype)
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == rule_action:
-                                row.append(p.action)
-                            elif n == application:
-                                row.append(p.application)
-                            elif n == category:
-                                row.append(p.category)
-                            elif n == data_filtering:
-                                row.append(p.data_filtering )
-                            elif n == description:
-                                p.description = neutralise_newlines(p.description, args, logger)
-                                row.append(p.description)
-                            elif n == destination:
-                                row.append(p.destination)
-                            elif n == disable_server_response_inspection:
-                                row.append(p.disable_server_response_inspection)
-                            elif n == disabled:
-                                if p.disabled is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == file_blocking:
-                                row.append(p.file_blocking)
-                            elif n == fromzone:
-                                row.append(p.fromzone)
-                            elif n == group:
-                                row.append(p.group)
-                            elif n == hip_profiles:
-                                row.append(p.hip_profiles)
-                            elif n == icmp_unreachable:
-                                if p.icmp_unreachable is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == log_end:
-                                if p.log_end is False:
-                                    row.append('FALSE')
-                                else:
-                                    row.append('TRUE')
-                            elif n == log_setting:
-                                row.append(p.log_setting)
-                            elif n == log_start:
-                                if p.log_start is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == negate_destination:
-                                if p.negate_destination is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == negate_source:
-                                if p.negate_source is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == negate_target:
-                                if p.negate_target is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == schedule:
-                                row.append(p.schedule)
-                            elif n == service:
-                                row.append(p.service)
-                            elif n == source:
-                                row.append(p.source)
-                            elif n == source_user:
-                                row.append(p.source_user)
-                            elif n == spyware:
-                                row.append(p.spyware)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == target:
-                                row.append(p.target)
-                            elif n == tozone:
-                                row.append(p.tozone)
-                            elif n == subtype:
-                                row.append(p.type)
-                            elif n == url_filtering:
-                                row.append(p.url_filtering)
-                            elif n == virus:
-                                row.append(p.virus)
-                            elif n == vulnerability:
-                                row.append(p.vulnerability)
-                            elif n == wildfire_analysis:
-                                row.append(p.wildfire_analysis)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), NatRule):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append(ruletype)
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == description:
-                                p.description = neutralise_newlines(p.description, args, logger)
-                                row.append(p.description)
-                            elif n == destination:
-                                row.append(p.destination)
-                            elif n == destination_dynamic_translated_address:
-                                row.append(p.destination_dynamic_translated_address)
-                            elif n == destination_dynamic_translated_distribution:
-                                row.append(p.destination_dynamic_translated_distribution)
-                            elif n == destination_dynamic_translated_port:
-                                row.append(p.destination_dynamic_translated_port)
-                            elif n == destination_translated_address:
-                                row.append(p.destination_translated_address)
-                            elif n == destination_translated_port:
-                                row.append(p.destination_translated_port)
-                            elif n == disabled:
-                                if p.disabled is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == fromzone:
-                                row.append(p.fromzone)
-                            elif n == ha_binding:
-                                row.append(p.ha_binding)
-                            elif n == nat_type:
-                                row.append(p.nat_type)
-                            elif n == negate_target:
-                                if p.negate_target is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == service:
-                                row.append(p.service)
-                            elif n == source:
-                                row.append(p.source)
-                            elif n == source_translation_address_type:
-                                row.append(p.source_translation_address_type)
-                            elif n == source_translation_fallback_interface:
-                                row.append(p.source_translation_fallback_interface)
-                            elif n == source_translation_fallback_ip_address:
-                                row.append(p.source_translation_fallback_ip_address)
-                            elif n == source_translation_fallback_ip_type:
-                                row.append(p.source_translation_fallback_ip_type)
-                            elif n == source_translation_fallback_translated_addresses:
-                                row.append(p.source_translation_fallback_translated_addresses)
-                            elif n == source_translation_fallback_type:
-                                row.append(p.source_translation_fallback_type)
-                            elif n == source_translation_interface:
-                                row.append(p.source_translation_interface)
-                            elif n == source_translation_ip_address:
-                                row.append(p.source_translation_ip_address)
-                            elif n == source_translation_static_bi_directional:
-                                if p.source_translation_static_bi_directional is True:
-                                    row.append('TRUE')
-                                else:
-                                    row.append('FALSE')
-                            elif n == source_translation_static_translated_address:
-                                row.append(p.source_translation_static_translated_address)
-                            elif n == source_translation_translated_addresses:
-                                row.append(p.source_translation_translated_addresses)
-                            elif n == source_translation_type:
-                                row.append(p.source_translation_type)
-                            elif n == tag:
-                                row.append(p.tag)
-                            elif n == target:
-                                row.append(p.target)
-                            elif n == interface:
-                                row.append(p.to_interface)
-                            elif n == tozone:
-                                row.append(p.tozone)
-                            else:
-                                row.append('')
-
-                    elif issubclass(type(p), Zone):
-
-                        for n in range(0, csv_fields):
-                            if n == vendor:
-                                row.append('palo')
-                            elif n == objtype:
-                                row.append('zone')
-                            elif n == op_action:
-                                row.append('__ACTION__')
-                            elif n == location:
-                                row.append(objsource)
-                            elif n == name:
-                                row.append(p.name)
-                            elif n == interface:
-                                row.append(p.interface)
-                            elif n == zone:
-                                row.append(p.mode)
-                            elif n == mgmt_profile:
-                                row.append(p.zone_profile)
-                            elif n == log_setting:
-                                row.append(p.log_setting)
-                            elif n == enable_user_identification:
-                                row.append(p.enable_user_identification)
-                            elif n == source:
-                                row.append(p.exclude_acl)
-                            elif n == destination:
-                                row.append(p.exclude_acl)
-                            else:
-                                row.append('')
 
-                    # add a final entry to ensure that if anyone edits with Excel that all the empty fields are written.
-                    row.append('end')
-                    writer.writerow(row)
+                for section_name, objects, ruletype in sections:
+                    if objects:
+                        if args.verbose:
+                            logger.info('Writing \'{}\' to file \'{}.csv\' with {} objects'.format(section_name, filename, len(objects)))
+                        writer.writerows(get_rows(objects, ruletype))
+                    else:
+                        if not args.quiet:
+                            logger.info('\'{}\' list is empty so nothing to write!'.format(section_name))
 
             f.close()
 
@@ -3395,7 +3751,8 @@ def write_objects_dbedit_csv(filename, name, objects, ruletype, objsource, filem
             logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
     else:
         if not args.quiet:
-            logger.info('\'{}\' list is empty so nothing to write!'.format(name))
+            for section_name, objects, ruletype in sections:
+                logger.info('\'{}\' list is empty so nothing to write!'.format(section_name))
 
 ####################################################################################
 #
@@ -3403,10 +3760,11 @@ def write_objects_dbedit_csv(filename, name, objects, ruletype, objsource, filem
 #
 ####################################################################################
 
-def get_palo_dg_rules(tree, args, logger):
+def get_palo_dg_rules(tree, args, logger, snapshot=None):
 
     # takes pandevice object and refreshes Device Group Security and NAT rules before returning lists of said rules
     # note that the pandevice object already contains pre/post rulebase objects in the tree before this function is called
+    # if a snapshot is given the rules are built from it instead of the live device
 
     # instantiate empty lists in case there are no rulebase objects present
     pre_sec_rules = list()
@@ -3426,13 +3784,13 @@ def get_palo_dg_rules(tree, args, logger):
         if issubclass(type(child), PreRulebase):
 
             try:
-                pre_sec_rules = SecurityRule.refreshall(child)
+                pre_sec_rules = refreshall_palo(SecurityRule, child, snapshot)
                 pre_found = True
             except Exception as e:
                 logger.error('Cannot refresh SecurityRule for device \'{}\', ({}).'.format(tree.name, neutralise_newlines(repr(e), args, logger)))
 
             try:
-                pre_nat_rules = NatRule.refreshall(child)
+                pre_nat_rules = refreshall_palo(NatRule, child, snapshot)
                 pre_found = True
             except Exception as e:
                 logger.error('Cannot refresh NatRule for device \'{}\', ({}).'.format(tree.name, neutralise_newlines(repr(e), args, logger)))
@@ -3441,13 +3799,13 @@ def get_palo_dg_rules(tree, args, logger):
         if issubclass(type(child), PostRulebase):
 
             try:
-                post_sec_rules = SecurityRule.refreshall(child)
+                post_sec_rules = refreshall_palo(SecurityRule, child, snapshot)
                 post_found = True
             except Exception as e:
                 logger.error('Cannot refresh SecurityRule for device \'{}\', ({}).'.format(tree.name, neutralise_newlines(repr(e), args, logger)))
 
             try:
-                post_nat_rules = NatRule.refreshall(child)
+                post_nat_rules = refreshall_palo(NatRule, child, snapshot)
                 post_found = True
             except Exception as e:
                 logger.error('Cannot refresh NatRule for device \'{}\', ({}).'.format(tree.name, neutralise_newlines(repr(e), args, logger)))
@@ -3683,28 +4041,12 @@ def get_palo_routes(tree, args, logger):
 
     return routes, route_names
 
-def get_palo_objects(tree, args, logger):
+def get_palo_objects(tree, args, logger, snapshot=None):
 
     # takes pandevice object and refreshes all object types before returning lists of objects and sets of object names
+    # if a snapshot is given the objects are built from it instead of the live device
 
-    addresses = list()
-    address_groups = list()
-    applications = list()
-    application_groups = list()
-    services = list()
-    service_groups = list()
-    tags = list()
-    application_containers = list()
-    application_filters = list()
-    address_names = set()
-    address_group_names  = set()
-    application_names = set()
-    application_group_names = set()
-    application_container_names = set()
-    application_filter_names = set()
-    service_names = set()
-    service_group_names = set()
-    tag_names = set()
+    refreshed = dict()
 
     if issubclass(type(tree), Panorama):
         name = tree.hostname
@@ -3713,89 +4055,170 @@ def get_palo_objects(tree, args, logger):
     else:
         name = tree.name
 
-    try:
-        # this is a list of AddressObject Objects and a set of AddressObject names
-        addresses = AddressObject.refreshall(tree, add=True)
-        address_names = {o.name for o in addresses}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' AddressObject objects'.format(name, len(address_names)))
-    except Exception as e:
-        logger.error('Cannot refresh AddressObject for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    # object types in the order they are returned
+    subclasses = [AddressObject, AddressGroup, ApplicationObject, ApplicationGroup, ServiceObject, ServiceGroup, Tag, ApplicationContainer, ApplicationFilter]
 
-    try:
-        # this is a list of AddressGroup Objects and a set of AddressGroup names
-        address_groups = AddressGroup.refreshall(tree, add=True)
-        address_group_names = {o.name for o in address_groups}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' AddressGroup objects'.format(name, len(address_group_names)))
-    except Exception as e:
-        logger.error('Cannot refresh AddressGroup for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    if args.collect_workers > 1 and snapshot is None:
+        # fetch all object types at once (see '--collect-workers')
+        refreshed = refreshall_palo_concurrent(tree, name, subclasses, args, logger)
+    else:
+        for subclass in subclasses:
+            try:
+                # this is a list of <subclass> Objects
+                refreshed[subclass] = refreshall_palo(subclass, tree, snapshot)
+            except Exception as e:
+                logger.error('Cannot refresh {} for device \'{}\', ({}).'.format(subclass.__name__, name, neutralise_newlines(repr(e), args, logger)))
 
-    try:
-        # this is a list of ApplicationObject Objects and a set of ApplicationObject name
-        applications = ApplicationObject.refreshall(tree, add=True)
-        application_names = {o.name for o in applications}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' ApplicationObject objects'.format(name, len(application_names)))
-    except Exception as e:
-        logger.error('Cannot refresh ApplicationObject for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    # a failed refresh leaves an empty list and an empty set of names for that object type
+    objects = {subclass: refreshed.get(subclass, list()) for subclass in subclasses}
+    names = {subclass: {o.name for o in objects[subclass]} for subclass in subclasses}
 
-    try:
-        # this is a list of ApplicationGroup Objects and a set of ApplicationGroup names
-        application_groups = ApplicationGroup.refreshall(tree, add=True)
-        application_group_names = {o.name for o in application_groups}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' ApplicationGroup objects'.format(name, len(application_group_names)))
-    except Exception as e:
-        logger.error('Cannot refresh ApplicationGroup for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    if args.verbose:
+        for subclass in subclasses:
+            if subclass in refreshed:
+                logger.info('Live Device: \'{}\': Found \'{}\' {} objects'.format(name, len(names[subclass]), subclass.__name__))
 
-    try:
-        # this is a list of ServiceObject Objects and a set of ServiceObject names
-        services = ServiceObject.refreshall(tree, add=True)
-        service_names = {o.name for o in services}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' ServiceObject objects'.format(name, len(service_names)))
-    except Exception as e:
-        logger.error('Cannot refresh ServiceObject for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    return [o for subclass in subclasses for o in objects[subclass]], \
+           names[AddressObject], names[AddressGroup], names[ApplicationObject], names[ApplicationGroup], names[ApplicationContainer], names[ApplicationFilter], names[ServiceObject], names[ServiceGroup], names[Tag]
 
-    try:
-        # this is a list of ServiceGroup Objects and a set of ServiceGroup names
-        service_groups = ServiceGroup.refreshall(tree, add=True)
-        service_group_names = {o.name for o in service_groups}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' ServiceGroup objects'.format(name, len(service_group_names)))
-    except Exception as e:
-        logger.error('Cannot refresh ServiceGroup for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+def refreshall_palo_concurrent(tree, name, subclasses, args, logger):
 
-    try:
-        # this is a list of Tag Objects and a set of Tag names
-        tags = Tag.refreshall(tree, add=True)
-        tag_names = {o.name for o in tags}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' Tag objects'.format(name, len(tag_names)))
-    except Exception as e:
-        logger.error('Cannot refresh Tag for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    # takes pandevice object and list of object classes, fetches the config for every class on a pool of '--collect-workers' threads
+    # returns dictionary of class -> list of refreshed objects, classes that failed to refresh are left out
+    # pan-python keeps the last response on the xapi object so each worker gets its own connection
+    # parsing and adding to the tree is done here, not in the workers, so the pandevice tree is only ever changed by one thread
 
-    try:
-        # this is a list of ApplicationContainer Objects and a set of ApplicationContainer names
-        application_containers = ApplicationContainer.refreshall(tree, add=True)
-        application_container_names = {o.name for o in application_containers}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' ApplicationContainer objects'.format(name, len(application_container_names)))
-    except Exception as e:
-        logger.error('Cannot refresh ApplicationContainer for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+    refreshed = dict()
+    futures = OrderedDict()
+
+    device = tree.nearest_pandevice()
+
+    # resolve the api key (the property fetches it on first use) and the versioned xpaths before any threads start
+    device.api_key
+    instances = dict()
+    for subclass in subclasses:
+        instance = subclass()
+        instance.parent = tree
+        instances[subclass] = instance
+
+    def fetch(xpath):
+        xapi = device.generate_xapi()
+        try:
+            return xapi.get(xpath, retry_on_peer=False)
+        except Exception as e:
+            # same as refreshall - a missing node just means there are none of this type
+            if str(e).startswith("No such node"):
+                return None
+            raise
+
+    with ThreadPoolExecutor(max_workers=args.collect_workers) as executor:
+        for subclass in subclasses:
+            futures[subclass] = executor.submit(fetch, instances[subclass].xpath_nosuffix())
+
+        for subclass, future in futures.items():
+            try:
+                root = future.result()
+                instances_found = list()
+                if root is not None:
+                    lasttag = instances[subclass].XPATH.rsplit("/", 1)[-1]
+                    obj = root.find("result/" + lasttag)
+                    if obj is not None:
+                        instances_found = instances[subclass].refreshall_from_xml(obj)
+                # same as refreshall(add=True)
+                tree.removeall(cls=subclass)
+                tree.extend(instances_found)
+                refreshed[subclass] = instances_found
+            except Exception as e:
+                logger.error('Cannot refresh {} for device \'{}\', ({}).'.format(subclass.__name__, name, neutralise_newlines(repr(e), args, logger)))
+
+    if args.verbose == 3:
+        logger.debug('refreshall_palo_concurrent \'{}\': fetched \'{}\' object types with \'{}\' workers'.format(name, len(futures), args.collect_workers))
+
+    return refreshed
+
+def get_palo_snapshot(tree, args, logger, xapi=None, cache=None):
+
+    # takes Panorama or Device Group pandevice object and reads its whole configuration subtree in a single API call
+    # objects and rules are then built locally from the snapshot so they all come from the same read
+    # optional xapi is used instead of the device connection (see 'get_palo_snapshots')
+    # optional cache is checked before the live device is read, and updated after (see '--cache-ttl')
+    # returns ConfigSnapshot, or None if the read failed (callers fall back to refreshing from the live device)
+
+    if issubclass(type(tree), Panorama):
+        name = tree.hostname
+        xpath = '/config/shared'
+    else:
+        name = tree.name
+        xpath = tree.xpath()
+
+    if cache is not None:
+        result = read_palo_cache(cache, xpath, args, logger)
+        if result is not None:
+            return ConfigSnapshot(xpath, result.find('*'))
 
     try:
-        # this is a list of ApplicationFilter Objects and a set of ApplicationFilter names
-        application_filters = ApplicationFilter.refreshall(tree, add=True)
-        application_filter_names = {o.name for o in application_filters}
-        if args.verbose:
-            logger.info('Live Device: \'{}\': Found \'{}\' ApplicationFilter objects'.format(name, len(application_filter_names)))
+        if xapi is None:
+            xapi = tree.nearest_pandevice().xapi
+        read_at = time.time()
+        response = xapi.get(xpath, retry_on_peer=True)
+        snapshot = ConfigSnapshot(xpath, response.find('result/*'), read_at)
+        if cache is not None:
+            write_palo_cache(cache, xpath, response.find('result'), args, logger)
     except Exception as e:
-        logger.error('Cannot refresh ApplicationFilter for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+        logger.error('Cannot read configuration snapshot for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+        return None
+
+    if args.verbose:
+        logger.info('Live Device: \'{}\': Read configuration snapshot of \'{}\''.format(name, xpath))
+
+    return snapshot
+
+def get_palo_snapshots(pano, device_groups, args, logger, cache=None):
+
+    # takes Panorama pandevice object and list of Device Groups, reads a snapshot of each Device Group on a pool of '--dg-workers' threads
+    # returns dictionary of Device Group name -> ConfigSnapshot (None where the read failed)
+    # only the reads run concurrently, each on its own xapi connection - objects/rules are built and updates applied one Device Group at a time
+
+    snapshots = dict()
+    futures = OrderedDict()
+
+    # resolve the api key and PAN-OS version (needed for the xpaths) before any threads start
+    pano.api_key
+    for device_group in device_groups:
+        device_group.xpath()
+
+    def read(device_group):
+        return get_palo_snapshot(device_group, args, logger, pano.generate_xapi(), cache)
+
+    with ThreadPoolExecutor(max_workers=args.dg_workers) as executor:
+        for device_group in device_groups:
+            futures[device_group.name] = executor.submit(read, device_group)
+
+        for name, future in futures.items():
+            snapshots[name] = future.result()
+
+    if args.verbose:
+        logger.info('Live Device: \'{}\': Read \'{}\' Device Group snapshots with \'{}\' workers'.format(pano.hostname, len(snapshots), args.dg_workers))
+
+    return snapshots
+
+def refreshall_palo(subclass, parent, snapshot=None):
+
+    # takes pandevice class and parent object and returns list of refreshed objects, same as 'refreshall(parent, add=True)'
+    # objects are built from the snapshot when it covers the parent, otherwise they are refreshed from the live device
+
+    instance = subclass()
+    instance.parent = parent
+    xpath = instance.xpath_nosuffix()
+
+    if snapshot is None or not snapshot.covers(xpath):
+        return subclass.refreshall(parent, add=True)
+
+    instances = instance.refreshall_from_xml(snapshot.find(xpath))
+    parent.removeall(cls=subclass)
+    parent.extend(instances)
 
-    return addresses + address_groups + applications + application_groups + services + service_groups + tags + application_containers + application_filters, \
-           address_names, address_group_names, application_names, application_group_names, application_container_names, application_filter_names, service_names, service_group_names, tag_names
+    return instances
 
 def get_palo_predefined_objects(tree, args, logger):
 
@@ -3814,6 +4237,33 @@ def get_palo_predefined_objects(tree, args, logger):
 
     # Predefined objects are a special case!
 
+    # they only change with the App-ID content version so they are cached locally keyed on that version
+    cache = None
+    complete = True
+
+    try:
+        content_version = tree.show_system_info()['system']['app-version']
+        cache = ConfigCache(__cache_dir__ + 'predefined/', name, content_version, None, args.refresh_cache)
+    except Exception as e:
+        logger.error('Cannot determine content version for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+
+    if cache is not None:
+        cached = read_palo_cache(cache, 'predefined', args, logger)
+
+        if cached is not None:
+            predefined_application_names = {m.text for m in cached.findall('application/member')}
+            predefined_application_container_names = {m.text for m in cached.findall('application-container/member')}
+            predefined_service_names = {m.text for m in cached.findall('service/member')}
+            predefined_tag_names = {m.text for m in cached.findall('tag/member')}
+
+            if args.verbose:
+                logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined ApplicationObject objects (content version \'{}\')'.format(name, len(predefined_application_names), content_version))
+                logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined ApplicationContainer objects (content version \'{}\')'.format(name, len(predefined_application_container_names), content_version))
+                logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined ServiceObject objects (content version \'{}\')'.format(name, len(predefined_service_names), content_version))
+                logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined Tag objects (content version \'{}\')'.format(name, len(predefined_tag_names), content_version))
+
+            return predefined_application_names, predefined_application_container_names, predefined_service_names, predefined_tag_names
+
     try:
         tree.predefined.refreshall_applications()
         p_apps = tree.predefined.application_objects.values()
@@ -3825,6 +4275,7 @@ def get_palo_predefined_objects(tree, args, logger):
             logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined ApplicationContainer objects'.format(name, len(predefined_application_container_names)))
     except Exception as e:
         logger.error('Cannot refresh predefined Applications for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+        complete = False
 
     try:
         tree.predefined.refreshall_services()
@@ -3834,6 +4285,7 @@ def get_palo_predefined_objects(tree, args, logger):
             logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined ServiceObject objects'.format(name, len(predefined_service_names)))
     except Exception as e:
         logger.error('Cannot refresh predefined Services for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+        complete = False
 
     try:
         tree.predefined.refreshall_tags()
@@ -3843,17 +4295,28 @@ def get_palo_predefined_objects(tree, args, logger):
             logger.info('Live Device: \'{}\': Found \'{}\' Pre-Defined Tag objects'.format(name, len(predefined_tag_names)))
     except Exception as e:
         logger.error('Cannot refresh predefined Tags for device \'{}\', ({}).'.format(name, neutralise_newlines(repr(e), args, logger)))
+        complete = False
+
+    # only cache a full set of names, a partial one would hide objects until the next content version
+    if cache is not None and complete:
+        predefined = ET.Element('predefined')
+        for tag, names in (('application', predefined_application_names), ('application-container', predefined_application_container_names), ('service', predefined_service_names), ('tag', predefined_tag_names)):
+            element = ET.SubElement(predefined, tag)
+            for n in sorted(names):
+                ET.SubElement(element, 'member').text = n
+        write_palo_cache(cache, 'predefined', predefined, args, logger)
 
     return predefined_application_names, predefined_application_container_names, predefined_service_names, predefined_tag_names
 
 def get_palo_dips(tree, args, logger):
 
-    # takes pandevice object and returns list of registered-ip Objects
-    # tree.userid.unregister(ip, tags)
-    # if >500 objects pan-os returns file to download instead.
-    # run 'show object registered-ip all option file', which will write the file to /var/log/pan/regipdump instead. Then you can view the file with 'less mp-log regipdump'.
+    # takes pandevice object and returns list of registered-ip Objects and a dictionary of ip -> set of tags for existence checks
+    # PAN-OS 8.0+ returns the registered-ips 500 at a time and pandevice pages through them, so the whole set is collected
+    # older PAN-OS returns a file instead ('show object registered-ip all option file' -> 'less mp-log regipdump') which cannot be read over the API,
+    # in that case (or on any other error) the index is None and existence checks are skipped rather than trusting a partial set
 
     dips = list()
+    dip_index = None
 
     if issubclass(type(tree), Firewall):
         name = tree.hostname
@@ -3862,6 +4325,7 @@ def get_palo_dips(tree, args, logger):
 
     try:
         dips_dict = tree.userid.get_registered_ip()
+        dip_index = {ip: set(tags) for ip, tags in dips_dict.items()}
 
         for ip in dips_dict.keys():
             for tag in dips_dict[ip]:
@@ -3870,13 +4334,12 @@ def get_palo_dips(tree, args, logger):
 
     except Exception as e:
         logger.error("{}".format(neutralise_newlines(repr(e), args, logger)))
+        logger.warning('Live Device: \'{}\': Registered-IPs (DIPs) could not be read in full, DIP existence checks are skipped'.format(name))
 
-    dip_names = {o.name for o in dips}
-
-    if args.verbose:
-        logger.info('Live Device: \'{}\': Found \'{}\' registered-IPs (DIPs)'.format(name, len(dip_names)))
+    if args.verbose and dip_index is not None:
+        logger.info('Live Device: \'{}\': Found \'{}\' registered-IPs (DIPs) with \'{}\' tags'.format(name, len(dip_index), len(dips)))
 
-    return dips, dip_names
+    return dips, dip_index
 
 def get_palo_device_group_network_info(tree, args, logger):
 
@@ -3891,6 +4354,7 @@ def get_palo_device_group_network_info(tree, args, logger):
     template_stacks = list()
     device_groups = list()
     dg_virtual_systems = defaultdict(list)
+    serial_templates = defaultdict(list)
     template_zones = defaultdict(list)
     template_devices = defaultdict(list)
     template_interfaces = defaultdict(list)
@@ -3932,7 +4396,7 @@ def get_palo_device_group_network_info(tree, args, logger):
                 #    full_vsys_name = '__'.join([child.name, child.display_name])
                 #else:
                 #    full_vsys_name = child.name
-                template_vsys = '__'.join([template.name, child.name])
+                template_vsys = (template.name, child.name)
                 zones, live_zone_names = get_palo_zones(child, args, logger)
                 if zones:
                     for z in zones:
@@ -3961,49 +4425,40 @@ def get_palo_device_group_network_info(tree, args, logger):
     except Exception as e:
         logger.error('Cannot refresh DeviceGroup for device \'{}\', ({}).'.format(tree.hostname, neutralise_newlines(repr(e), args, logger)))
 
+    # Panorama reports the vsys of every connected firewall in one call, only probe each firewall (see '--probe-workers' and '--probe-timeout') if that fails
+    firewalls = [child for dg in device_groups for child in dg.children if issubclass(type(child), Firewall)]
+    firewall_vsys = get_palo_connected_vsys(tree, firewalls, args, logger)
+    if firewall_vsys is None:
+        firewall_vsys = probe_palo_firewalls(tree, firewalls, args, logger)
+
     for dg in device_groups:
         for child in dg.children:
-            if issubclass(type(child), Firewall):
-                # this is the part that needs firewall to be connected
-                try:
-                    child.refresh_system_info()
-                    Vsys.refreshall(child)
-                    if child.serial:
-                        # record the serial number under this Device Group
-                        dg_devices[dg.name].append(child.serial)
-                        for grandchild in child.children:
-                            if issubclass(type(grandchild), Vsys):
-                                # record the vsys name under this devicegroup
-                                dg_vsys = '__'.join([dg.name, grandchild.name])
-                                dg_virtual_systems[dg_vsys].append(child.serial)
-                                logger.info('DG stuff {}, {}.'.format(dg_vsys, child.serial))
-                                # DG stuff Campus - Edge__vsys2, 010108002206.
-
-                except Exception as e:
-                    logger.error('Cannot refresh_system_info for device \'{}\', ({}).'.format(child.hostname, neutralise_newlines(repr(e), args, logger)))
-                    pass
+            if child in firewall_vsys and child.serial:
+                # record the serial number under this Device Group
+                dg_devices[dg.name].append(child.serial)
+                for vsys in firewall_vsys[child]:
+                    # record the vsys name under this devicegroup and firewall
+                    dg_virtual_systems[(dg.name, child.serial)].append(vsys)
+                    if args.verbose == 3:
+                        logger.debug('Device Group VSYS {}, {}, {}.'.format(dg.name, vsys, child.serial))
+
+    # index the templates by serial number once rather than comparing every pair of serial numbers
+    for td in template_devices:
+        for tsn in template_devices[td]:
+            serial_templates[tsn].append(td)
 
     # find matches on serial number to create dictionary of available network information
+    # a Template pairs with a Device Group on each firewall in both, the zones and interfaces come from the Template vsys the Device Group uses on that firewall
     for dg in dg_devices:
+        template_vsys_matches = OrderedDict()
         for sn in dg_devices[dg]:
-            for td in template_devices:
-                for tsn in template_devices[td]:
-                    if tsn == sn:
-                        # we have a match on serial numbers here so Template must pair with Device Group on the physical device
-                        # now figure out which vsys on that fw is related to this Device Group
-                        for t in template_zones:
-                            data = t.split("__",2) # maxsplit - Campus__Law <template name>__<vsys name>
-                            for g in dg_virtual_systems:
-                                dgdata = g.split("__",2) # maxsplit <dg name>__<vsys name>
-                                if dgdata[0] == dg:
-                                    if dgdata[1] == data[1]:
-                                        for z in template_zones[t]:
-                                            dg_zones[dg].append(z)
-
-                        for t in template_interfaces:
-                            if t == td:
-                                for i in template_interfaces[t]:
-                                    dg_interfaces[dg].append(i)
+            for td in serial_templates[sn]:
+                for vsys in dg_virtual_systems[(dg, sn)]:
+                    template_vsys_matches[(td, vsys)] = True
+
+        for template_vsys in template_vsys_matches:
+            dg_zones[dg].extend(template_zones[template_vsys])
+            dg_interfaces[dg].extend(template_interfaces[template_vsys])
 
     # make the zones unique
     #for gp in dg_zones:
@@ -4014,6 +4469,88 @@ def get_palo_device_group_network_info(tree, args, logger):
 
     return dg_zones, gp_interfaces
 
+def get_palo_connected_vsys(pano, firewalls, args, logger):
+
+    # takes Panorama pandevice object and list of managed Firewall objects, reads the vsys names of every connected firewall with one 'show devices connected'
+    # returns dictionary of Firewall -> list of vsys names like 'probe_palo_firewalls', firewalls that are not connected are left out and summarised once
+    # returns None if the command fails so the caller can probe each firewall instead
+
+    firewall_vsys = dict()
+    not_connected = list()
+
+    if not firewalls:
+        return firewall_vsys
+
+    try:
+        devices = pano.op('show devices connected').find('result/devices')
+    except Exception as e:
+        logger.warning('Cannot read connected devices from \'{}\', probing each firewall instead, ({}).'.format(pano.hostname, neutralise_newlines(repr(e), args, logger)))
+        return None
+
+    if devices is None:
+        logger.warning('No connected devices reported by \'{}\', probing each firewall instead.'.format(pano.hostname))
+        return None
+
+    # serial -> vsys names, entries are keyed on serial number
+    connected = dict()
+    for entry in devices.findall('entry'):
+        connected[entry.findtext('serial') or entry.get('name')] = [v.get('name') for v in entry.findall('vsys/entry')]
+
+    for firewall in firewalls:
+        if firewall.serial in connected:
+            firewall_vsys[firewall] = connected[firewall.serial]
+        else:
+            not_connected.append(firewall.serial)
+
+    if not_connected:
+        logger.warning('Live Device: \'{}\': \'{}\' of \'{}\' managed firewalls not connected, their zones and interfaces are not checked: {}'.format(pano.hostname, len(not_connected), len(firewalls), ', '.join(str(serial) for serial in not_connected)))
+
+    if args.verbose:
+        logger.info('Live Device: \'{}\': Found \'{}\' connected managed firewalls'.format(pano.hostname, len(connected)))
+
+    return firewall_vsys
+
+def probe_palo_firewalls(pano, firewalls, args, logger):
+
+    # takes Panorama pandevice object and list of managed Firewall objects, refreshes system info and reads the vsys names of each on a pool of '--probe-workers' threads
+    # returns dictionary of Firewall -> list of vsys names, firewalls that fail or do not answer within '--probe-timeout' seconds are left out and summarised once
+    # each firewall has its own xapi connection through Panorama and the vsys are not added to the tree, so the workers never share state
+
+    firewall_vsys = dict()
+    unreachable = list()
+    futures = OrderedDict()
+
+    if not firewalls:
+        return firewall_vsys
+
+    # resolve the api key before any threads start, every firewall connection reuses it
+    pano.api_key
+
+    def probe(firewall):
+        if args.probe_timeout:
+            firewall.timeout = args.probe_timeout
+        firewall.refresh_system_info()
+        return [v.name for v in Vsys.refreshall(firewall, add=False)]
+
+    with ThreadPoolExecutor(max_workers=args.probe_workers) as executor:
+        for firewall in firewalls:
+            futures[firewall] = executor.submit(probe, firewall)
+
+        for firewall, future in futures.items():
+            try:
+                firewall_vsys[firewall] = future.result()
+            except Exception as e:
+                logger.error('Cannot refresh_system_info for device \'{}\', ({}).'.format(firewall.serial, neutralise_newlines(repr(e), args, logger)))
+                unreachable.append(firewall.serial)
+
+    if unreachable:
+        logger.warning('Live Device: \'{}\': \'{}\' of \'{}\' managed firewalls unreachable, their zones and interfaces are not checked: {}'.format(pano.hostname, len(unreachable), len(futures), ', '.join(str(serial) for serial in unreachable)))
+
+    if args.verbose:
+        logger.info('Live Device: \'{}\': Probed \'{}\' managed firewalls with \'{}\' workers'.format(pano.hostname, len(futures), args.probe_workers))
+
+    return firewall_vsys
+
 ####################################################################################
 #
 # Utility functions
@@ -4048,6 +4585,13 @@ def get_args():
     fw_group.add_argument('-u', '--username', action='store', required=True, help="Username of device")
     fw_group.add_argument('-p', '--password', action='store', required=True, help="Password of device")
     fw_group.add_argument('-l', '--location', action='store', required=False, help="Device Group, VSYS or VRF")
+    fw_group.add_argument('--snapshot', action='store_true', help="Read Panorama shared and Device Group config in one API call each and build objects/rules locally")
+    fw_group.add_argument('--cache-ttl', action='store', type=int, default=0, metavar='MINUTES', help="Reuse Panorama config read in the last MINUTES from the local cache (default 0, no cache)")
+    fw_group.add_argument('--refresh-cache', action='store_true', help="Ignore the local cache and read the live device again (the cache is then updated)")
+    fw_group.add_argument('--dg-workers', action='store', type=int, default=1, metavar='N', help="Read Device Groups from Panorama on N concurrent connections before processing them (default 1)")
+    fw_group.add_argument('--collect-workers', action='store', type=int, default=1, metavar='N', help="Fetch object types from the device on N concurrent connections (default 1)")
+    fw_group.add_argument('--probe-workers', action='store', type=int, default=1, metavar='N', help="Probe Panorama managed firewalls for zone/interface checks on N concurrent connections (default 1)")
+    fw_group.add_argument('--probe-timeout', action='store', type=int, default=None, metavar='SECONDS', help="Give up on a managed firewall probe after SECONDS (default is the pandevice timeout)")
 
     # Display/Output options
     log_group = parser.add_argument_group('Display/Output')
@@ -4059,8 +4603,14 @@ def get_args():
     # API action options
     api_group = parser.add_argument_group('CSV file actions')
     api_group.add_argument('-f', '--filename', action='store', required=False, help="CSV input file")
+    api_group.add_argument('--patch', action='store', nargs='+', metavar=('TYPE', 'VARIABLE=VALUE'), help="Edit the TYPE objects (e.g. pre-security-rule) selected by '--where' with each VARIABLE=VALUE, instead of a CSV input file")
+    api_group.add_argument('--where', action='append', metavar='SELECTOR', help="Select objects for '--patch' with VARIABLE=VALUE (equal to, or a member of a list) or VARIABLE~REGEX, repeat to select objects matching every SELECTOR")
     api_group.add_argument('--no-checks', action='store_true', help="Do not perform object integrity checks")
     api_group.add_argument('--no-locks', action='store_true', help="Do not take config/commit locks (use for DIP updates)")
+    api_group.add_argument('--reconcile', action='store_true', help="Compare CSV objects with the live device and only write real changes")
+    api_group.add_argument('--batch-size', action='store', type=int, default=0, metavar='N', help="Create objects in batches of N per API call (default 0, one call per object)")
+    api_group.add_argument('--object-max-age', action='store', type=int, default=300, metavar='SECONDS', help="Edit, rename, delete and modify objects collected in the last SECONDS without reading them again, 0 always reads them again (default 300)")
+    api_group.add_argument('--dip-batch-size', action='store', type=int, default=1000, metavar='N', help="Send registered-ip (DIP) updates N at a time in one User-ID message, 0 sends one message per DIP (default 1000)")
 
     api_group1 = api_group.add_mutually_exclusive_group(required=False)
     api_group1.add_argument('-t', '--test', action='store_true', help="Test config from CSV input file")
@@ -4221,6 +4771,126 @@ def neutralise_newlines(value, args, logger):
 
     return value
 
+def normalise_palo_value(value):
+
+    # takes a pandevice variable value and returns it in a form that can be compared
+    # None, empty and False are all 'not set', single values and lists are both lists, and member order does not matter
+
+    if value is None or value is False or value == '' or value == []:
+        return None
+    if value is True:
+        return True
+    if isinstance(value, (list, tuple)):
+        return sorted(str(v) for v in value)
+
+    return [str(value)]
+
+def get_palo_config_version(tree, args, logger):
+
+    # takes pandevice device object and returns the id of its last commit job, used to key the local cache
+    # returns 'unknown' if this cannot be determined, cache entries then only expire via '--cache-ttl'
+    # returns None if the candidate config has uncommitted changes, reads are of the candidate so no cache entry can be trusted
+
+    version = 'unknown'
+
+    try:
+        if tree.pending_changes():
+            logger.warning('Live Device: \'{}\': Candidate config has uncommitted changes, the local cache is not used'.format(tree.hostname))
+            return None
+    except Exception as e:
+        logger.error('Cannot check pending changes for device \'{}\', ({}). The local cache is not used'.format(tree.hostname, neutralise_newlines(repr(e), args, logger)))
+        return None
+
+    try:
+        response = tree.op('<show><jobs><all></all></jobs></show>', cmd_xml=False)
+        commit_ids = [int(job.findtext('id')) for job in response.findall('./result/job') if job.findtext('type') == 'Commit' and job.findtext('id')]
+        if commit_ids:
+            version = str(max(commit_ids))
+    except Exception as e:
+        logger.error('Cannot determine config version for device \'{}\', ({}).'.format(tree.hostname, neutralise_newlines(repr(e), args, logger)))
+
+    if args.verbose:
+        logger.info('Live Device: \'{}\': Config version \'{}\''.format(tree.hostname, version))
+
+    return version
+
+def read_palo_cache(cache, key, args, logger):
+
+    # takes ConfigCache and key (xpath) and returns the cached XML Element, or None if missing, expired or '--refresh-cache' given
+
+    if cache.refresh:
+        return None
+
+    filename = cache.filename(key)
+
+    try:
+        age = time.time() - os.path.getmtime(filename)
+    except OSError:
+        return None
+
+    if cache.ttl is not None and age > cache.ttl * 60:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        return None
+
+    try:
+        element = ET.parse(filename).getroot()
+    except Exception as e:
+        logger.error('Cannot read cache file \'{}\', ({}).'.format(filename, neutralise_newlines(repr(e), args, logger)))
+        return None
+
+    if args.verbose:
+        logger.info('Cache: \'{}\': Using cached copy of \'{}\' (\'{}\' seconds old)'.format(cache.device, key, int(age)))
+
+    return element
+
+def write_palo_cache(cache, key, element, args, logger):
+
+    # takes ConfigCache, key (xpath) and XML Element and writes it to the cache directory
+    # written to a temporary file first so a concurrent reader never sees half a file
+
+    if element is None:
+        return
+
+    filename = cache.filename(key)
+
+    try:
+        os.makedirs(cache.directory, exist_ok=True)
+        ET.ElementTree(element).write(filename + '.tmp', encoding='utf-8')
+        os.replace(filename + '.tmp', filename)
+    except Exception as e:
+        logger.error('Cannot write cache file \'{}\', ({}).'.format(filename, neutralise_newlines(repr(e), args, logger)))
+
+def purge_palo_cache(cache, args, logger, expired_only=False):
+
+    # takes ConfigCache and removes all the entries for its device, or only those older than '--cache-ttl'
+
+    removed = 0
+
+    if expired_only and cache.ttl is None:
+        return
+
+    try:
+        filenames = os.listdir(cache.directory)
+    except OSError:
+        return
+
+    for filename in filenames:
+        fullfilename = cache.directory + filename
+        if not fullfilename.startswith(cache.prefix()):
+            continue
+        try:
+            if not expired_only or time.time() - os.path.getmtime(fullfilename) > cache.ttl * 60:
+                os.remove(fullfilename)
+                removed += 1
+        except OSError:
+            pass
+
+    if args.verbose and removed:
+        logger.info('Cache: \'{}\': Removed \'{}\' cache entries'.format(cache.device, removed))
+
 def send_email(subject, toaddress, filename, message, args, logger):
 
     # dont send emails unless test is on
@@ -4332,7 +5002,7 @@ def release_locks(tree, args, logger):
 
 def tidy_up(tree, failures, args, logger):
 
-    if args.filename and not args.test:
+    if args.update and not args.test:
         if failures:
             if args.commit:
                 logger.error('API update failures exist. Not committing configuration! Reverting... \'{}\''.format(tree.hostname))
@@ -4387,10 +5057,47 @@ def main():
        logger.info("Argument \'--location\' supplied, location in scope \'{}\' only.".format(args.location))
     if args.filename:
        logger.info("Argument \'--filename\' supplied, configuration contained in \'{}\'".format(args.filename))
+    patch = None
+    if args.patch:
+       if args.filename or args.no_checks:
+           logger.error('Argument \'--patch\' cannot be used with \'--filename\' or \'--no-checks\', the objects to patch are selected from the live device. Exiting...')
+           sys.exit(1)
+       patch = get_patch_args(args, logger)
+       if patch is None:
+           sys.exit(1)
+       logger.info('Argument \'--patch\' supplied, \'{}\' objects matching \'{}\' will be edited with \'{}\'.'.format(args.patch[0], ' '.join(args.where), ' '.join(args.patch[1:])))
+    # a patch is applied in the same way as a CSV file of edits
+    args.update = bool(args.filename or args.patch)
     if args.no_checks:
        logger.info('Argument \'--no-checks\' supplied, no integrity checks performed on dbedit file or in relation to existing configuration.')
     if args.no_locks:
        logger.info('Argument \'--no-locks\' supplied, no commit or configuration locks will be taken.')
+    if args.reconcile:
+       if args.no_checks:
+           logger.warning('Argument \'--reconcile\' supplied with \'--no-checks\', live objects are not collected so reconcile is disabled.')
+           args.reconcile = False
+       else:
+           logger.info('Argument \'--reconcile\' supplied, existing objects will only be written if they differ from the CSV.')
+    if args.batch_size:
+       logger.info('Argument \'--batch-size\' supplied, objects will be created in batches of \'{}\' per API call.'.format(args.batch_size))
+    if args.object_max_age != 300:
+       logger.info('Argument \'--object-max-age\' supplied, objects collected in the last \'{}\' seconds will be written without reading them again.'.format(args.object_max_age))
+    if args.dip_batch_size != 1000:
+       logger.info('Argument \'--dip-batch-size\' supplied, registered-ips will be sent \'{}\' per User-ID message.'.format(args.dip_batch_size))
+    if args.snapshot:
+       logger.info('Argument \'--snapshot\' supplied, Panorama objects and rules will be built from one configuration read per location.')
+    if args.cache_ttl:
+       logger.info('Argument \'--cache-ttl\' supplied, Panorama configuration read in the last \'{}\' minutes will be reused from the local cache.'.format(args.cache_ttl))
+    if args.refresh_cache:
+       logger.info('Argument \'--refresh-cache\' supplied, local cache will be refreshed from the live device.')
+    if args.dg_workers > 1:
+       logger.info('Argument \'--dg-workers\' supplied, Device Groups will be read on \'{}\' concurrent connections.'.format(args.dg_workers))
+    if args.collect_workers > 1:
+       logger.info('Argument \'--collect-workers\' supplied, objects will be fetched on \'{}\' concurrent connections.'.format(args.collect_workers))
+    if args.probe_workers > 1:
+       logger.info('Argument \'--probe-workers\' supplied, managed firewalls will be probed on \'{}\' concurrent connections.'.format(args.probe_workers))
+    if args.probe_timeout:
+       logger.info('Argument \'--probe-timeout\' supplied, managed firewalls not answering within \'{}\' seconds are skipped.'.format(args.probe_timeout))
     if args.test:
        logger.info('Argument \'--test\' supplied, TEST mode - will not perform updates via API.')
     if args.commit:
@@ -4464,13 +5171,21 @@ def main():
     null_set = set()
     dbedit_objects = dict()
 
+    # objects collected from the live device this run, edits/renames/deletes reuse them instead of reading them again (see '--object-max-age')
+    live_objects = ObjectCache(args.object_max_age)
+
     # order of this list is important - DO NOT EDIT!
-    csv_action_types = ['delete', 'rename', 'create', 'edit', 'addtogroup', 'removefromgroup']
+    csv_action_types = ['delete', 'rename', 'create', 'edit', 'addtogroup', 'removefromgroup', 'sync']
 
     if args.filename:
         if not args.quiet:
             logger.info('Filename \'{}\' provided. Parsing...'.format(args.filename))
         dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules = read_dbedit_csv(args, logger, args.filename, emails, email_subject, email_message, logfile)
+    elif patch:
+        # the edits are added per location once its objects have been collected (see 'get_palo_patch_edits')
+        dbedit_objects = DbeditIndex()
+        dbedit_pano_pre_rules = DbeditIndex()
+        dbedit_pano_post_rules = DbeditIndex()
 
     ###############################################################################
     #
@@ -4497,9 +5212,23 @@ def main():
         #
         ###############################################################################
 
-        if args.filename and not args.test and not args.no_locks:
+        if args.update and not args.test and not args.no_locks:
             take_locks(pano, args, logger)
 
+        ###############################################################################
+        #
+        # Open the local cache of Panorama configuration reads (see '--cache-ttl')
+        #
+        ###############################################################################
+
+        cache = None
+
+        if args.cache_ttl:
+            version = get_palo_config_version(pano, args, logger)
+            if version is not None:
+                cache = ConfigCache(__cache_dir__, pano.hostname, version, args.cache_ttl, args.refresh_cache)
+                purge_palo_cache(cache, args, logger, expired_only=True)
+
         if args.location:
 
             ###############################################################################
@@ -4509,13 +5238,18 @@ def main():
             ###############################################################################
 
             if not args.test:
-                if args.output or (args.filename and not args.no_checks):
+                if args.output or (args.update and not args.no_checks):
 
                     # collect Global Objects
                     if args.verbose:
                         logger.info('Collecting Global Objects from Panorama \'{}\''.format(pano.hostname))
 
-                    all_global_objects, G_address_names, G_address_group_names, G_application_names, G_application_group_names, G_application_container_names, G_application_filter_names, G_service_names, G_service_group_names, G_tag_names = get_palo_objects(pano, args, logger)
+                    # read the whole of shared in one go (see '--snapshot')
+                    global_snapshot = None
+                    if args.snapshot or cache:
+                        global_snapshot = get_palo_snapshot(pano, args, logger, None, cache)
+
+                    all_global_objects, G_address_names, G_address_group_names, G_application_names, G_application_group_names, G_application_container_names, G_application_filter_names, G_service_names, G_service_group_names, G_tag_names = get_palo_objects(pano, args, logger, global_snapshot)
 
                     # collect Pre-Defined Objects
                     if args.verbose:
@@ -4557,7 +5291,7 @@ def main():
 
             except Exception as e:
                 logger.error('Cannot refresh Device Groups for device \'{}\', ({}) exiting...'.format(pano.hostname, neutralise_newlines(repr(e), args, logger)))
-                if args.filename and not args.test and not args.no_locks:
+                if args.update and not args.test and not args.no_locks:
                     release_locks(pano, args, logger)
                 sys.exit(1)
 
@@ -4589,7 +5323,7 @@ def main():
 
             except Exception as e:
                 logger.error('Cannot refresh Templates for device \'{}\', ({}) exiting...'.format(pano.hostname, neutralise_newlines(repr(e), args, logger)))
-                if args.filename and not args.test and not args.no_locks:
+                if args.update and not args.test and not args.no_locks:
                     release_locks(pano, args, logger)
 
             ###############################################################################
@@ -4602,10 +5336,24 @@ def main():
                 logger.error('Requested Device Group or Template \'{}\' is not found, exiting...'.format(args.location))
                 for email in emails:
                     send_email(email_subject, email + __email_domain__, logfile, email_message, args, logger)
-                if args.filename and not args.test and not args.no_locks:
+                if args.update and not args.test and not args.no_locks:
                     release_locks(pano, args, logger)
                 sys.exit(1)
 
+            ###############################################################################
+            #
+            # read the Device Groups concurrently up front if requested (see '--dg-workers')
+            #
+            ###############################################################################
+
+            dg_snapshots = dict()
+
+            if args.dg_workers > 1 and (args.output or (args.update and not args.no_checks)):
+                if args.verbose:
+                    logger.info('Reading Device Groups from Panorama \'{}\' with \'{}\' workers'.format(pano.hostname, args.dg_workers))
+
+                dg_snapshots = get_palo_snapshots(pano, [c for c in pano.children if issubclass(type(c), DeviceGroup)], args, logger, cache)
+
             ###############################################################################
             #
             # iterate over the Device Groups added to 'pano'
@@ -4637,7 +5385,7 @@ def main():
 
                     tp_zones, tp_vrouters, tp_zone_names, tp_vrouter_names = get_palo_network(child, args, logger)
 
-                    if args.output or args.test or (args.filename and not args.no_checks):
+                    if args.output or args.test or (args.update and not args.no_checks):
 
                         # collect Template interfaces
                         if args.verbose:
@@ -4682,7 +5430,7 @@ def main():
 
                     for vrouter in tp_vrouters:
 
-                        if args.output or args.test or (args.filename and not args.no_checks):
+                        if args.output or args.test or (args.update and not args.no_checks):
 
                             if args.verbose:
                                 logger.info('Collecting routes for router \'{}\''.format(vrouter.name))
@@ -4701,7 +5449,7 @@ def main():
                         ###############################################################################
 
                         if args.output:
-                            write_objects_dbedit_csv(filename + '_apidata-' + t, 'VRF Static Routes', vrf_static_routes, 'route', vrouter.name, 'append', args, logger)
+                            write_objects_dbedit_csv(filename + '_apidata-' + t, [('VRF Static Routes', vrf_static_routes, 'route')], vrouter.name, 'append', args, logger)
 
                         ###############################################################################
                         #
@@ -4722,7 +5470,7 @@ def main():
                         #
                         ###############################################################################
 
-                        if args.filename:
+                        if args.update:
 
                             for action in csv_action_types:
 
@@ -4749,27 +5497,43 @@ def main():
                     #
                     ###############################################################################
 
-                    if args.output or (args.filename and not args.no_checks):
+                    if args.output or (args.update and not args.no_checks):
+
+                        # read the whole Device Group in one go so objects and rules come from the same read (see '--snapshot')
+                        dg_snapshot = None
+                        if child.name in dg_snapshots:
+                            dg_snapshot = dg_snapshots[child.name]
+                        elif args.snapshot or cache:
+                            dg_snapshot = get_palo_snapshot(child, args, logger, None, cache)
 
                         # collect Device Group Objects
                         if args.verbose:
                             logger.info('Collecting objects for Device Group \'{}\''.format(child.name))
 
-                        all_dg_objects, dg_address_names, dg_address_group_names, dg_application_names, dg_application_group_names, dg_application_container_names, dg_application_filter_names, dg_service_names, dg_service_group_names, dg_tag_names = get_palo_objects(child, args, logger)
+                        collected_at = time.time()
+                        all_dg_objects, dg_address_names, dg_address_group_names, dg_application_names, dg_application_group_names, dg_application_container_names, dg_application_filter_names, dg_service_names, dg_service_group_names, dg_tag_names = get_palo_objects(child, args, logger, dg_snapshot)
 
                         # collect Device Group Rules
                         if args.verbose:
                             logger.info('Collecting rules for Device Group \'{}\''.format(child.name))
 
-                        pre_sec_rules, post_sec_rules, pre_nat_rules, post_nat_rules, dg_rule_names, dg_nat_names = get_palo_dg_rules(child, args, logger)
+                        pre_sec_rules, post_sec_rules, pre_nat_rules, post_nat_rules, dg_rule_names, dg_nat_names = get_palo_dg_rules(child, args, logger, dg_snapshot)
+
+                        # objects built from a snapshot are as old as the snapshot
+                        live_objects.add(all_dg_objects + pre_sec_rules + post_sec_rules + pre_nat_rules + post_nat_rules, dg_snapshot.read_at if dg_snapshot is not None else collected_at)
+
+                        # select the objects to patch from what was just collected (see '--patch')
+                        if patch:
+                            for o in get_palo_patch_edits(patch, all_dg_objects, {'pre-security-rule': pre_sec_rules, 'post-security-rule': post_sec_rules, 'pre-nat-rule': pre_nat_rules, 'post-nat-rule': post_nat_rules}, child.name, args, logger):
+                                dbedit_objects.add('palo', child.name, 'edit', o)
 
 			# create list of zones for Device Group
                         device_group_zones = list()
                         device_group_zones = all_device_group_zones[child.name]
                         
                         # collect Device Group zones and interfaces (requires connected firewalls)
-                        if args.filename and not args.no_checks:
-                            dg_zone_names = all_device_group_zones[child.name]
+                        if args.update and not args.no_checks:
+                            dg_zone_names = {z.name for z in all_device_group_zones[child.name]}
                             dg_interface_names = all_device_group_interfaces[child.name]
 
                             # collect Device Group objects from dbedit file
@@ -4782,12 +5546,12 @@ def main():
                     ###############################################################################
 
                     if args.output:
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Device Group Objects', all_dg_objects, None, child.name, 'append', args, logger)
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Device Group Pre-Security Rules', pre_sec_rules, 'pre-security-rule', child.name, 'append', args, logger)
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Device Group Post-Security Rules', post_sec_rules, 'post-security-rule', child.name, 'append', args, logger)
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Device Group Pre-NAT Rules', pre_nat_rules, 'pre-nat-rule', child.name, 'append', args, logger)
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Device Group Post-NAT Rules', post_nat_rules, 'post-nat-rule', child.name, 'append', args, logger)
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Device Group Zones', device_group_zones, None, child.name, 'append', args, logger)
+                        write_objects_dbedit_csv(filename + '_apidata-' + t, [('Device Group Objects', all_dg_objects, None),
+                                                                              ('Device Group Pre-Security Rules', pre_sec_rules, 'pre-security-rule'),
+                                                                              ('Device Group Post-Security Rules', post_sec_rules, 'post-security-rule'),
+                                                                              ('Device Group Pre-NAT Rules', pre_nat_rules, 'pre-nat-rule'),
+                                                                              ('Device Group Post-NAT Rules', post_nat_rules, 'post-nat-rule'),
+                                                                              ('Device Group Zones', device_group_zones, None)], child.name, 'append', args, logger)
 
                     ###############################################################################
                     #
@@ -4810,7 +5574,7 @@ def main():
                     #
                     ###############################################################################
 
-                    if args.filename:
+                    if args.update:
 
                         if not args.quiet:
                             logger.info('Device Group \'{}\': dbedit update checking...'.format(child.name))
@@ -4823,34 +5587,30 @@ def main():
 
                         if not args.no_checks:
 
-                            global_tag_names = pd_live_tag_names.union(G_tag_names)
-                            global_application_names = pd_live_application_names.union(G_application_names)
-                            global_application_container_names = pd_live_application_container_names.union(G_application_container_names)
-                            global_service_names = pd_live_service_names.union(G_service_names)
-
-                            available_address_names = dg_address_names.union(G_address_names)
-                            available_address_group_names = dg_address_group_names.union(G_address_group_names)
-                            staged_application_names = dg_application_names.union(global_application_names)
-                            available_application_group_names = dg_application_group_names.union(G_application_group_names)
-                            available_application_filter_names = dg_application_filter_names.union(G_application_filter_names)
-                            available_service_names = dg_service_names.union(global_service_names)
-                            available_service_group_names = dg_service_group_names.union(G_service_group_names)
-                            available_tag_names = dg_tag_names.union(global_tag_names)
-                            available_application_names = staged_application_names.union(global_application_container_names)
+                            # names are looked up layer by layer (predefined -> shared -> device group) instead of copying them into new sets (see NameScope)
+                            # objects of parent Device Groups are not collected so there is no layer for them
+                            available_address_names = NameScope(('shared', G_address_names), ('device group', dg_address_names))
+                            available_address_group_names = NameScope(('shared', G_address_group_names), ('device group', dg_address_group_names))
+                            available_application_names = NameScope(('predefined', pd_live_application_names), ('predefined', pd_live_application_container_names), ('shared', G_application_names), ('shared', G_application_container_names), ('device group', dg_application_names))
+                            available_application_group_names = NameScope(('shared', G_application_group_names), ('device group', dg_application_group_names))
+                            available_application_filter_names = NameScope(('shared', G_application_filter_names), ('device group', dg_application_filter_names))
+                            available_service_names = NameScope(('predefined', pd_live_service_names), ('shared', G_service_names), ('device group', dg_service_names))
+                            available_service_group_names = NameScope(('shared', G_service_group_names), ('device group', dg_service_group_names))
+                            available_tag_names = NameScope(('predefined', pd_live_tag_names), ('shared', G_tag_names), ('device group', dg_tag_names))
 
                             dg_route_names = set()
 
                         else:
 
                             # just make empty sets instead
-                            available_address_names = set()
-                            available_address_group_names = set()
-                            available_application_names = set()
-                            available_application_group_names = set()
-                            available_application_filter_names = set()
-                            available_service_names = set()
-                            available_service_group_names = set()
-                            available_tag_names = set()
+                            available_address_names = NameScope()
+                            available_address_group_names = NameScope()
+                            available_application_names = NameScope()
+                            available_application_group_names = NameScope()
+                            available_application_filter_names = NameScope()
+                            available_service_names = NameScope()
+                            available_service_group_names = NameScope()
+                            available_tag_names = NameScope()
 
                             dg_zone_names = set()
                             dg_rule_names = set()
@@ -4875,6 +5635,15 @@ def main():
 
                             addresses, address_groups, services, service_groups, tags, applications, application_groups, pre_rules, post_rules, pre_nats, post_nats, deletions, renames, edits, modifications, static_routes, dips, dbedit_addresses, dbedit_address_groups, dbedit_services, dbedit_service_groups, dbedit_tags, dbedit_applications, dbedit_application_groups, dbedit_application_filter_names, dbedit_pre_rules, dbedit_pre_nats, dbedit_post_rules, dbedit_post_nats, dbedit_deletions, dbedit_renames, dbedit_edits, dbedit_modifications, dbedit_static_routes, dbedit_dips = get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules, 'palo', child.name, action, 'Device Group', args, logger)
 
+                            # names this dbedit file creates are searched after the live ones, the sets are layered once per action instead of copied per update_objects call
+                            pending_tag_names = available_tag_names.extend('dbedit', dbedit_tags)
+                            pending_address_names = available_address_names.extend('dbedit', dbedit_addresses)
+                            pending_address_group_names = available_address_group_names.extend('dbedit', dbedit_address_groups)
+                            pending_service_names = available_service_names.extend('dbedit', dbedit_services)
+                            pending_service_group_names = available_service_group_names.extend('dbedit', dbedit_service_groups)
+                            pending_application_names = available_application_names.extend('dbedit', dbedit_applications)
+                            pending_application_group_names = available_application_group_names.extend('dbedit', dbedit_application_groups)
+
                             ###############################################################################
                             #
                             # Create all the objects and rules ensuring specific creation order - DO NOT 'union' with dbedit for the object being created!
@@ -4885,22 +5654,22 @@ def main():
                             update_objects(tags, child, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Addresses
-                            update_objects(addresses, child, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(addresses, child, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Address Groups
-                            update_objects(address_groups, child, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(address_groups, child, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Services
-                            update_objects(services, child, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(services, child, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Service Groups
-                            update_objects(service_groups, child, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names.union(dbedit_services), available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(service_groups, child, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, pending_service_names, available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Applications
                             update_objects(applications, child, 'Device Group', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Application Groups
-                            update_objects(application_groups, child, 'Device Group', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names.union(dbedit_applications), available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(application_groups, child, 'Device Group', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, pending_application_names, available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Security and NAT rules - don't forget the hierarchy here, Device Group->Pre/Post-Rulebase->SecurityRule/NatRule
                             for grandchild in child.children:
@@ -4910,17 +5679,17 @@ def main():
 
                                 if issubclass(type(grandchild), PreRulebase):
                                     # update Rules by sending PreRulebase object (e.g. grandchild)
-                                    update_objects(pre_rules, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
+                                    update_objects(pre_rules, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
 
                                     # update NAT rules by sending PreRulebase object (e.g. grandchild)
-                                    update_objects(pre_nats, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
+                                    update_objects(pre_nats, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
 
                                 if issubclass(type(grandchild), PostRulebase):
                                     # update Rules by sending PostRulebase object (e.g. grandchild)
-                                    update_objects(post_rules, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
+                                    update_objects(post_rules, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
 
                                     # update NAT rules by sending PostRulebase object (e.g. grandchild)
-                                    update_objects(post_nats, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
+                                    update_objects(post_nats, grandchild, 'Device Group', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, null_set, null_set)
 
                             # perform Deletions
                             #update_objects(deletions, child, 'Device Group', child.name, action, args, logger, filename, failures, dg_tag_names, dg_address_names, dg_address_group_names, dg_service_names, dg_service_group_names, dg_application_names, dg_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, dg_route_names, null_set)
@@ -4929,7 +5698,7 @@ def main():
                             #update_objects(renames, child, 'Device Group', child.name, action, args, logger, filename, failures, dg_tag_names, dg_address_names, dg_address_group_names, dg_service_names, dg_service_group_names, dg_application_names, dg_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, dg_route_names, null_set)
 
                             # perform Edits
-                            update_objects(edits, child, 'Device Group', child.name, action, args, logger, filename, failures, dg_tag_names, dg_address_names, dg_address_group_names, dg_service_names, dg_service_group_names, dg_application_names, dg_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, dg_route_names, null_set)
+                            update_objects(edits, child, 'Device Group', child.name, action, args, logger, filename, failures, dg_tag_names, dg_address_names, dg_address_group_names, dg_service_names, dg_service_group_names, dg_application_names, dg_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, dg_route_names, null_set, live_objects)
 
                             # perform Group Modifications
                             #update_objects(modifications, child, 'Device Group', child.name, action, args, logger, filename, failures, dg_tag_names, dg_address_names, dg_address_group_names, dg_service_names, dg_service_group_names, dg_application_names, dg_application_group_names, dg_rule_names, dg_zone_names, dg_nat_names, dg_interface_names, dg_route_names, null_set)
@@ -4957,13 +5726,25 @@ def main():
             #
             ###############################################################################
 
-            if args.output or (args.filename and not args.no_checks):
+            if args.output or (args.update and not args.no_checks):
 
                 # collect Global Objects
                 if args.verbose:
                     logger.info('Collecting Global Objects from Panorama \'{}\''.format(pano.hostname))
 
-                all_global_objects, G_address_names, G_address_group_names, G_application_names, G_application_group_names, G_application_container_names, G_application_filter_names, G_service_names, G_service_group_names, G_tag_names = get_palo_objects(pano, args, logger)
+                # read the whole of shared in one go (see '--snapshot')
+                global_snapshot = None
+                if args.snapshot or cache:
+                    global_snapshot = get_palo_snapshot(pano, args, logger, None, cache)
+
+                collected_at = time.time()
+                all_global_objects, G_address_names, G_address_group_names, G_application_names, G_application_group_names, G_application_container_names, G_application_filter_names, G_service_names, G_service_group_names, G_tag_names = get_palo_objects(pano, args, logger, global_snapshot)
+                live_objects.add(all_global_objects, global_snapshot.read_at if global_snapshot is not None else collected_at)
+
+                # select the objects to patch from what was just collected (see '--patch')
+                if patch:
+                    for o in get_palo_patch_edits(patch, all_global_objects, dict(), 'global', args, logger):
+                        dbedit_objects.add('palo', 'global', 'edit', o)
 
                 # collect Pre-Defined Objects
                 if args.verbose:
@@ -4972,7 +5753,7 @@ def main():
                 pd_live_application_names, pd_live_application_container_names, pd_live_service_names, pd_live_tag_names = get_palo_predefined_objects(pano, args, logger)
 
                 # collect Global objects from dbedit file
-                if args.filename and not args.no_checks:
+                if args.update and not args.no_checks:
                     a, b, c, d, e, f, g, h, i, j, k, l, m, n, o, p, q, dbedit_addresses, dbedit_address_groups, dbedit_services, dbedit_service_groups, dbedit_tags, dbedit_applications, dbedit_application_groups, dbedit_application_filter_names, dbedit_pre_rules, dbedit_pre_nats, dbedit_post_rules, dbedit_post_nats, dbedit_deletions, dbedit_renames, dbedit_edits, dbedit_modifications, dbedit_static_routes, dbedit_dips = get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules, 'palo', 'global', 'create', 'Panorama', args, logger)
 
             ##############################################################################
@@ -4982,7 +5763,7 @@ def main():
             ###############################################################################
 
             if args.output:
-                write_objects_dbedit_csv(filename + '_apidata-' + t, 'Panorama Shared Objects', all_global_objects, None, pano.hostname, 'write', args, logger)
+                write_objects_dbedit_csv(filename + '_apidata-' + t, [('Panorama Shared Objects', all_global_objects, None)], pano.hostname, 'write', args, logger)
 
             ###############################################################################
             #
@@ -4999,7 +5780,7 @@ def main():
             #
             ###############################################################################
 
-            if args.filename:
+            if args.update:
 
                 if not args.quiet:
                     logger.info('Panorama \'{}\' dbedit update checking...'.format(pano.hostname))
@@ -5012,30 +5793,26 @@ def main():
 
                 if not args.no_checks:
 
-                    global_tag_names = pd_live_tag_names.union(G_tag_names)
-                    global_application_names = pd_live_application_names.union(G_application_names)
-                    global_application_container_names = pd_live_application_container_names.union(G_application_container_names)
-                    global_service_names = pd_live_service_names.union(G_service_names)
-
-                    available_address_names = G_address_names
-                    available_address_group_names = G_address_group_names
-                    available_application_names = global_application_names.union(global_application_container_names)
-                    available_application_group_names = G_application_group_names
-                    available_application_filter_names = G_application_filter_names
-                    available_service_names = global_service_names
-                    available_service_group_names = G_service_group_names
-                    available_tag_names = global_tag_names
+                    # names are looked up layer by layer (predefined -> shared) instead of copying them into new sets (see NameScope)
+                    available_address_names = NameScope(('shared', G_address_names))
+                    available_address_group_names = NameScope(('shared', G_address_group_names))
+                    available_application_names = NameScope(('predefined', pd_live_application_names), ('predefined', pd_live_application_container_names), ('shared', G_application_names), ('shared', G_application_container_names))
+                    available_application_group_names = NameScope(('shared', G_application_group_names))
+                    available_application_filter_names = NameScope(('shared', G_application_filter_names))
+                    available_service_names = NameScope(('predefined', pd_live_service_names), ('shared', G_service_names))
+                    available_service_group_names = NameScope(('shared', G_service_group_names))
+                    available_tag_names = NameScope(('predefined', pd_live_tag_names), ('shared', G_tag_names))
 
                 else:
 
-                    available_address_names = set()
-                    available_address_group_names = set()
-                    available_application_names = set()
-                    available_application_group_names = set()
-                    available_application_filter_names = set()
-                    available_service_names = set()
-                    available_service_group_names = set()
-                    available_tag_names = set()
+                    available_address_names = NameScope()
+                    available_address_group_names = NameScope()
+                    available_application_names = NameScope()
+                    available_application_group_names = NameScope()
+                    available_application_filter_names = NameScope()
+                    available_service_names = NameScope()
+                    available_service_group_names = NameScope()
+                    available_tag_names = NameScope()
 
                 ###############################################################################
                 #
@@ -5047,6 +5824,15 @@ def main():
 
                     addresses, address_groups, services, service_groups, tags, applications, application_groups, pre_rules, post_rules, pre_nats, post_nats, deletions, renames, edits, modifications, static_routes, dips, dbedit_addresses, dbedit_address_groups, dbedit_services, dbedit_service_groups, dbedit_tags, dbedit_applications, dbedit_application_groups, dbedit_application_filter_names, dbedit_pre_rules, dbedit_pre_nats, dbedit_post_rules, dbedit_post_nats, dbedit_deletions, dbedit_renames, dbedit_edits, dbedit_modifications, dbedit_static_routes, dbedit_dips = get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules, 'palo', 'global', action, 'Panorama', args, logger)
 
+                    # names this dbedit file creates are searched after the live ones, the sets are layered once per action instead of copied per update_objects call
+                    pending_tag_names = available_tag_names.extend('dbedit', dbedit_tags)
+                    pending_address_names = available_address_names.extend('dbedit', dbedit_addresses)
+                    pending_address_group_names = available_address_group_names.extend('dbedit', dbedit_address_groups)
+                    pending_service_names = available_service_names.extend('dbedit', dbedit_services)
+                    pending_service_group_names = available_service_group_names.extend('dbedit', dbedit_service_groups)
+                    pending_application_names = available_application_names.extend('dbedit', dbedit_applications)
+                    pending_application_group_names = available_application_group_names.extend('dbedit', dbedit_application_groups)
+
                     ###############################################################################
                     #
                     # Create all the objects ensuring specific creation order - DO NOT 'union' with dbedit for the object being created!
@@ -5057,34 +5843,34 @@ def main():
                     update_objects(tags, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # update Addresses
-                    update_objects(addresses, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(addresses, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # update Address Groups
-                    update_objects(address_groups, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(address_groups, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, pending_address_names, available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # update Services
-                    update_objects(services, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(services, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # update Service Groups
-                    update_objects(service_groups, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names.union(dbedit_services), available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(service_groups, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, pending_service_names, available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # update Applications
                     update_objects(applications, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # update Application Groups
-                    update_objects(application_groups, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names.union(dbedit_applications), available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(application_groups, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, pending_application_names, available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
 
                     # perform Deletions
-                    update_objects(deletions, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(deletions, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                     # perform Renames
-                    update_objects(renames, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(renames, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                     # perform Edits
-                    update_objects(edits, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(edits, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                     # perform Group Modifications
-                    update_objects(modifications, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                    update_objects(modifications, pano, 'Panorama', pano.hostname, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
             else:
                 if not args.quiet:
@@ -5096,6 +5882,10 @@ def main():
         #
         ###############################################################################
 
+        # the candidate config may have changed so cached reads are no longer valid
+        if cache and args.update and not args.test:
+            purge_palo_cache(cache, args, logger)
+
         tidy_up(pano, failures, args, logger)
 
     ###############################################################################
@@ -5131,7 +5921,7 @@ def main():
         #
         ###############################################################################
 
-        if args.filename and not args.test and not args.no_locks:
+        if args.update and not args.test and not args.no_locks:
             take_locks(fw, args, logger)
 
         ###############################################################################
@@ -5142,7 +5932,7 @@ def main():
 
         zones, vrouters, live_zone_names, live_vrouter_names = get_palo_network(fw, args, logger)
 
-        if args.output or (args.filename and not args.no_checks):
+        if args.output or (args.update and not args.no_checks):
 
             phy_interfaces, sub_interfaces, vpn_interfaces, loop_interfaces, vlan_interfaces, agg_interfaces, live_phy_interfaces_names, live_sub_interfaces_names, live_vpn_interfaces_names, live_loop_interfaces_names, live_vlan_interfaces_names, live_agg_interfaces_names, all_interfaces = get_palo_interfaces(fw, args, logger)
             pd_live_application_names, pd_live_application_container_names, pd_live_service_names, pd_live_tag_names = get_palo_predefined_objects(fw, args, logger)
@@ -5174,7 +5964,7 @@ def main():
 
         for vrouter in vrouters:
 
-            if args.output or (args.filename and not args.no_checks):
+            if args.output or (args.update and not args.no_checks):
 
                 vrf_static_routes, vrf_static_route_names = get_palo_routes(vrouter, args, logger)
 
@@ -5190,7 +5980,7 @@ def main():
             ###############################################################################
 
             if args.output:
-                write_objects_dbedit_csv(filename + '_apidata-' + t, 'VRF Static Routes', vrf_static_routes, 'route', vrouter.name, 'append', args, logger)
+                write_objects_dbedit_csv(filename + '_apidata-' + t, [('VRF Static Routes', vrf_static_routes, 'route')], vrouter.name, 'append', args, logger)
 
             ###############################################################################
             #
@@ -5211,7 +6001,7 @@ def main():
             #
             ###############################################################################
 
-            if args.filename:
+            if args.update:
 
                 for action in csv_action_types:
 
@@ -5255,7 +6045,7 @@ def main():
                             logger.error('VSYS \'{}\' is not found, exiting...'.format(args.location))
                             for email in emails:
                                 send_email(email_subject, email + __email_domain__, logfile, email_message, args, logger)
-                            if args.filename and not args.test and not args.no_locks:
+                            if args.update and not args.test and not args.no_locks:
                                 release_locks(fw, args, logger)
                             sys.exit(1)
 
@@ -5297,9 +6087,16 @@ def main():
             if issubclass(type(child), Vsys):
                 if child.name == 'shared':
 
-                    if args.output or (args.filename and not args.no_checks):
+                    if args.output or (args.update and not args.no_checks):
 
+                        collected_at = time.time()
                         all_shared_objects, shared_address_names, shared_address_group_names, shared_application_names, shared_application_group_names, shared_application_container_names, shared_application_filter_names, shared_service_names, shared_service_group_names, shared_tag_names = get_palo_objects(child, args, logger)
+                        live_objects.add(all_shared_objects, collected_at)
+
+                        # select the objects to patch from what was just collected (see '--patch')
+                        if patch:
+                            for o in get_palo_patch_edits(patch, all_shared_objects, dict(), child.name, args, logger):
+                                dbedit_objects.add('palo', child.name, 'edit', o)
 
                     else:
 
@@ -5321,7 +6118,7 @@ def main():
                     ###############################################################################
 
                     if args.output:
-                        write_objects_dbedit_csv(filename + '_apidata-' + t, 'Firewall Shared Objects', all_shared_objects, None, child.name, 'append', args, logger)
+                        write_objects_dbedit_csv(filename + '_apidata-' + t, [('Firewall Shared Objects', all_shared_objects, None)], child.name, 'append', args, logger)
 
                     ###############################################################################
                     #
@@ -5338,7 +6135,7 @@ def main():
                     #
                     ###############################################################################
 
-                    if args.filename:
+                    if args.update:
 
                         if not args.quiet:
                             logger.info('VSYS \'{}\': dbedit update checking...'.format(child.name))
@@ -5351,30 +6148,31 @@ def main():
 
                         if not args.no_checks:
 
-                            def_application_names = pd_live_application_names.union(shared_application_names)
-                            def_application_container_names = pd_live_application_container_names.union(shared_application_container_names)
-                            def_service_names = pd_live_service_names.union(shared_service_names)
-                            def_tag_names = pd_live_tag_names.union(shared_tag_names)
-
-                            available_address_names = shared_address_names
-                            available_address_group_names = shared_address_group_names
-                            available_application_names = def_application_names.union(def_application_container_names)
-                            available_application_group_names = shared_application_group_names
-                            available_application_filter_names = shared_application_filter_names
+                            # names are looked up layer by layer (predefined -> shared) instead of copying them into new sets (see NameScope)
+                            def_application_names = NameScope(('predefined', pd_live_application_names), ('shared', shared_application_names))
+                            def_application_container_names = NameScope(('predefined', pd_live_application_container_names), ('shared', shared_application_container_names))
+                            def_service_names = NameScope(('predefined', pd_live_service_names), ('shared', shared_service_names))
+                            def_tag_names = NameScope(('predefined', pd_live_tag_names), ('shared', shared_tag_names))
+
+                            available_address_names = NameScope(('shared', shared_address_names))
+                            available_address_group_names = NameScope(('shared', shared_address_group_names))
+                            available_application_names = NameScope(('predefined', pd_live_application_names), ('predefined', pd_live_application_container_names), ('shared', shared_application_names), ('shared', shared_application_container_names))
+                            available_application_group_names = NameScope(('shared', shared_application_group_names))
+                            available_application_filter_names = NameScope(('shared', shared_application_filter_names))
                             available_service_names = def_service_names
-                            available_service_group_names = shared_service_group_names
+                            available_service_group_names = NameScope(('shared', shared_service_group_names))
                             available_tag_names = def_tag_names
 
                         else:
 
-                            available_address_names = set()
-                            available_address_group_names = set()
-                            available_application_names = set()
-                            available_application_group_names = set()
-                            available_application_filter_names = set()
-                            available_service_names = set()
-                            available_service_group_names = set()
-                            available_tag_names = set()
+                            available_address_names = NameScope()
+                            available_address_group_names = NameScope()
+                            available_application_names = NameScope()
+                            available_application_group_names = NameScope()
+                            available_application_filter_names = NameScope()
+                            available_service_names = NameScope()
+                            available_service_group_names = NameScope()
+                            available_tag_names = NameScope()
 
                         ###############################################################################
                         #
@@ -5386,6 +6184,15 @@ def main():
 
                             addresses, address_groups, services, service_groups, tags, applications, application_groups, pre_rules, post_rules, pre_nats, post_nats, deletions, renames, edits, modifications, static_routes, dips, dbedit_addresses, dbedit_address_groups, dbedit_services, dbedit_service_groups, dbedit_tags, dbedit_applications, dbedit_application_groups, dbedit_application_filter_names, dbedit_pre_rules, dbedit_pre_nats, dbedit_post_rules, dbedit_post_nats, dbedit_deletions, dbedit_renames, dbedit_edits, dbedit_modifications, dbedit_static_routes, dbedit_dips = get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules, 'palo', child.name, action, 'VSYS', args, logger)
 
+                            # names this dbedit file creates are searched after the live ones, the sets are layered once per action instead of copied per update_objects call
+                            pending_tag_names = available_tag_names.extend('dbedit', dbedit_tags)
+                            pending_address_names = available_address_names.extend('dbedit', dbedit_addresses)
+                            pending_address_group_names = available_address_group_names.extend('dbedit', dbedit_address_groups)
+                            pending_service_names = available_service_names.extend('dbedit', dbedit_services)
+                            pending_service_group_names = available_service_group_names.extend('dbedit', dbedit_service_groups)
+                            pending_application_names = available_application_names.extend('dbedit', dbedit_applications)
+                            pending_application_group_names = available_application_group_names.extend('dbedit', dbedit_application_groups)
+
                             ###############################################################################
                             #
                             # Create all the objects ensuring specific creation order - DO NOT 'union' with dbedit for the object being created!
@@ -5396,34 +6203,34 @@ def main():
                             update_objects(tags, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Addresses
-                            update_objects(addresses, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(addresses, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Address Groups
-                            update_objects(address_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(address_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Services
-                            update_objects(services, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(services, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Service Groups
-                            update_objects(service_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names.union(dbedit_services), available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(service_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, pending_service_names, available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Applications
                             update_objects(applications, child, 'Firewall', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # update Application Groups
-                            update_objects(application_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names.union(dbedit_applications), available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(application_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, pending_application_names, available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
 
                             # perform Deletions
-                            update_objects(deletions, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(deletions, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                             # perform Renames
-                            update_objects(renames, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(renames, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                             # perform Edits
-                            update_objects(edits, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(edits, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                             # perform Group Modifications
-                            update_objects(modifications, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), null_set, null_set, null_set, null_set, null_set, null_set)
+                            update_objects(modifications, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set, live_objects)
 
                     else:
                         if not args.quiet:
@@ -5446,16 +6253,16 @@ def main():
                 else:
                     full_vsys_name = child.name
 
-                if args.output or args.filename:
+                if args.output or args.update:
                     try:
                         vsys_fw = Firewall(args.device, args.username, args.password, vsys=child.name)
-                        registered_ips, dip_names = get_palo_dips(vsys_fw, args, logger)
+                        registered_ips, dip_index = get_palo_dips(vsys_fw, args, logger)
 
                     except Exception as e:
                         logger.error('Cannot create VSYS version of firewall \'{}\', ({}). This will affect DIPs! exiting...'.format(child.name, neutralise_newlines(repr(e), args, logger)))
                 else:
                     registered_ips = set()
-                    dip_names = set()
+                    dip_index = None
 
                 ###############################################################################
                 #
@@ -5463,12 +6270,19 @@ def main():
                 #
                 ###############################################################################
 
-                if args.output or (args.filename and not args.no_checks):
+                if args.output or (args.update and not args.no_checks):
 
                     # collect zones for this VSYS
                     zones, vsys_zone_names = get_palo_zones(child, args, logger)
+                    collected_at = time.time()
                     vs_all_live_objects, vs_live_address_names, vs_live_address_group_names, vs_live_application_names, vs_live_application_group_names, vs_live_application_container_names, vs_live_application_filter_names, vs_live_service_names, vs_live_service_group_names, vs_live_tag_names = get_palo_objects(child, args, logger)
                     sec_rules, nat_rules, vsys_rule_names, vsys_nat_names = get_palo_fw_rules(child, args, logger)
+                    live_objects.add(vs_all_live_objects + sec_rules + nat_rules, collected_at)
+
+                    # select the objects to patch from what was just collected (see '--patch')
+                    if patch:
+                        for o in get_palo_patch_edits(patch, vs_all_live_objects, {'security-rule': sec_rules, 'nat-rule': nat_rules}, child.name, args, logger):
+                            dbedit_objects.add('palo', child.name, 'edit', o)
                     all_live_objects = list(set(vs_all_live_objects))
 
                 else:
@@ -5498,10 +6312,10 @@ def main():
                 ###############################################################################
 
                 if args.output:
-                    write_objects_dbedit_csv(filename + '_apidata-' + t, 'VSYS Objects', all_live_objects, None, full_vsys_name, 'append', args, logger)
-                    write_objects_dbedit_csv(filename + '_apidata-' + t, 'VSYS Security Rules', sec_rules, 'security-rule', full_vsys_name, 'append', args, logger)
-                    write_objects_dbedit_csv(filename + '_apidata-' + t, 'VSYS NAT Rules', nat_rules, 'nat-rule', full_vsys_name, 'append', args, logger)
-                    write_objects_dbedit_csv(filename + '_apidata-' + t, 'Registered IPs', registered_ips, 'dip', full_vsys_name, 'append', args, logger)
+                    write_objects_dbedit_csv(filename + '_apidata-' + t, [('VSYS Objects', all_live_objects, None),
+                                                                          ('VSYS Security Rules', sec_rules, 'security-rule'),
+                                                                          ('VSYS NAT Rules', nat_rules, 'nat-rule'),
+                                                                          ('Registered IPs', registered_ips, 'dip')], full_vsys_name, 'append', args, logger)
 
                 ###############################################################################
                 #
@@ -5521,7 +6335,7 @@ def main():
                 #
                 ###############################################################################
 
-                if args.filename:
+                if args.update:
 
                     if not args.quiet:
                         logger.info('VSYS \'{}\': dbedit update checking...'.format(child.name))
@@ -5534,28 +6348,28 @@ def main():
 
                     if not args.no_checks:
 
-                        available_address_names = vs_live_address_names.union(shared_address_names)
-                        available_address_group_names = vs_live_address_group_names.union(shared_address_group_names)
-                        staged_application_names = vs_live_application_names.union(def_application_names)
-                        available_application_group_names = vs_live_application_group_names.union(shared_application_group_names)
-                        available_application_container_names = vs_live_application_container_names.union(def_application_container_names)
-                        available_application_filter_names = vs_live_application_filter_names.union(shared_application_filter_names)
-                        available_service_names = vs_live_service_names.union(def_service_names)
-                        available_service_group_names = vs_live_service_group_names.union(shared_service_group_names)
-                        available_tag_names = vs_live_tag_names.union(def_tag_names)
-                        available_application_names = staged_application_names.union(available_application_container_names)
+                        # names are looked up layer by layer (predefined -> shared -> vsys) instead of copying them into new sets (see NameScope)
+                        available_address_names = NameScope(('shared', shared_address_names), ('vsys', vs_live_address_names))
+                        available_address_group_names = NameScope(('shared', shared_address_group_names), ('vsys', vs_live_address_group_names))
+                        available_application_group_names = NameScope(('shared', shared_application_group_names), ('vsys', vs_live_application_group_names))
+                        available_application_container_names = NameScope(('', def_application_container_names), ('vsys', vs_live_application_container_names))
+                        available_application_filter_names = NameScope(('shared', shared_application_filter_names), ('vsys', vs_live_application_filter_names))
+                        available_service_names = NameScope(('', def_service_names), ('vsys', vs_live_service_names))
+                        available_service_group_names = NameScope(('shared', shared_service_group_names), ('vsys', vs_live_service_group_names))
+                        available_tag_names = NameScope(('', def_tag_names), ('vsys', vs_live_tag_names))
+                        available_application_names = NameScope(('', def_application_names), ('', available_application_container_names), ('vsys', vs_live_application_names))
 
                     else:
 
-                        available_address_names = set()
-                        available_address_group_names = set()
-                        available_application_names = set()
-                        available_application_group_names = set()
-                        available_application_container_names = set()
-                        available_application_filter_names = set()
-                        available_service_names = set()
-                        available_service_group_names = set()
-                        available_tag_names = set()
+                        available_address_names = NameScope()
+                        available_address_group_names = NameScope()
+                        available_application_names = NameScope()
+                        available_application_group_names = NameScope()
+                        available_application_container_names = NameScope()
+                        available_application_filter_names = NameScope()
+                        available_service_names = NameScope()
+                        available_service_group_names = NameScope()
+                        available_tag_names = NameScope()
 
                     ###############################################################################
                     #
@@ -5567,6 +6381,15 @@ def main():
 
                         addresses, address_groups, services, service_groups, tags, applications, application_groups, pre_rules, post_rules, pre_nats, post_nats, deletions, renames, edits, modifications, static_routes, dips, dbedit_addresses, dbedit_address_groups, dbedit_services, dbedit_service_groups, dbedit_tags, dbedit_applications, dbedit_application_groups, dbedit_application_filter_names, dbedit_pre_rules, dbedit_pre_nats, dbedit_post_rules, dbedit_post_nats, dbedit_deletions, dbedit_renames, dbedit_edits, dbedit_modifications, dbedit_static_routes, dbedit_dips = get_dbedit_actions(dbedit_objects, dbedit_pano_pre_rules, dbedit_pano_post_rules, 'palo', child.name, action, 'VSYS', args, logger)
 
+                        # names this dbedit file creates are searched after the live ones, the sets are layered once per action instead of copied per update_objects call
+                        pending_tag_names = available_tag_names.extend('dbedit', dbedit_tags)
+                        pending_address_names = available_address_names.extend('dbedit', dbedit_addresses)
+                        pending_address_group_names = available_address_group_names.extend('dbedit', dbedit_address_groups)
+                        pending_service_names = available_service_names.extend('dbedit', dbedit_services)
+                        pending_service_group_names = available_service_group_names.extend('dbedit', dbedit_service_groups)
+                        pending_application_names = available_application_names.extend('dbedit', dbedit_applications)
+                        pending_application_group_names = available_application_group_names.extend('dbedit', dbedit_application_groups)
+
                         ###############################################################################
                         #
                         # Create all the objects ensuring specific creation order - DO NOT 'union' with dbedit for the object being created!
@@ -5577,30 +6400,26 @@ def main():
                         update_objects(tags, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Dynamic IPs
-                        try:
-                            vsys_fw.userid.batch_start()
-                            update_objects(dips, vsys_fw, 'DIP', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, dip_names)
-                            vsys_fw.userid.batch_end()
-                        except Exception as e:
-                            logger.error('Cannot batch config for device \'{}\', ({}).'.format(child.name, neutralise_newlines(repr(e), args, logger)))
+                        # registered-ips are sent '--dip-batch-size' at a time in one User-ID message
+                        update_objects(dips, vsys_fw, 'DIP', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, dip_index)
 
                         # update Addresses
-                        update_objects(addresses, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                        update_objects(addresses, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, available_address_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Address Groups
-                        update_objects(address_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                        update_objects(address_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, available_address_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Services
-                        update_objects(services, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                        update_objects(services, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, available_service_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Service Groups
-                        update_objects(service_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), null_set, null_set, available_service_names.union(dbedit_services), available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
+                        update_objects(service_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, null_set, null_set, pending_service_names, available_service_group_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Applications
                         update_objects(applications, child, 'Firewall', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names, null_set, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Application Groups
-                        update_objects(application_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, available_application_names.union(dbedit_applications), available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
+                        update_objects(application_groups, child, 'Firewall', child.name, action, args, logger, filename, failures, null_set, null_set, null_set, null_set, null_set, pending_application_names, available_application_group_names, null_set, null_set, null_set, null_set, null_set, null_set)
 
                         # update Security and NAT rules - don't forget the hierarchy here, VSYS->Rulebase->SecurityRule/NatRule
                         for grandchild in child.children:
@@ -5610,22 +6429,22 @@ def main():
 
                             if issubclass(type(grandchild), Rulebase):
                                 # update Rules by sending Rulebase object (e.g. grandchild)
-                                update_objects(pre_rules, grandchild, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
+                                update_objects(pre_rules, grandchild, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
 
                                 # update NAT rules by sending Rulebase object (e.g. grandchild)
-                                update_objects(pre_nats, grandchild, 'Firewall', child.name, action, args, logger, filename, failures, available_tag_names.union(dbedit_tags), available_address_names.union(dbedit_addresses), available_address_group_names.union(dbedit_address_groups), available_service_names.union(dbedit_services), available_service_group_names.union(dbedit_service_groups), available_application_names.union(dbedit_applications), available_application_group_names.union(dbedit_application_groups), vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
+                                update_objects(pre_nats, grandchild, 'Firewall', child.name, action, args, logger, filename, failures, pending_tag_names, pending_address_names, pending_address_group_names, pending_service_names, pending_service_group_names, pending_application_names, pending_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
 
                         # perform Deletions
-                        update_objects(deletions, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
+                        update_objects(deletions, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set, live_objects)
 
                         # perform Renames
-                        update_objects(renames, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
+                        update_objects(renames, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set, live_objects)
 
                         # perform Edits
-                        update_objects(edits, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
+                        update_objects(edits, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set, live_objects)
 
                         # perform Group Modifications
-                        update_objects(modifications, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set)
+                        update_objects(modifications, child, 'Firewall', child.name, action, args, logger, filename, failures, vs_live_tag_names, vs_live_address_names, vs_live_address_group_names, vs_live_service_names, vs_live_service_group_names, vs_live_application_names, vs_live_application_group_names, vsys_rule_names, vsys_zone_names, vsys_nat_names, all_interfaces, null_set, null_set, live_objects)
 
                 else:
                     if not args.quiet: